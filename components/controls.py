@@ -5,16 +5,23 @@ Stateless: reads/writes state through return values.
 from __future__ import annotations
 
 import streamlit as st
-from typing import List
+from typing import List, Optional, Tuple
 
 from domain.models import (
     Context, MatchStage, FavStatus, Venue, ScoreState, SpecialSituation, PlayerReaction, TalkAudience
 )
 from domain.rules_engine import detect_fav_status
-from services.repository import Repository
+from services.fileio import file_version
+from services.repository import get_repo
 from services.session import serialize_context, deserialize_context
 
 
+@st.cache_data(show_spinner=False)
+def _load_presets(version: Optional[Tuple[int, int]]) -> List[dict]:
+    # version is only part of the cache key: saving a preset rewrites presets.json and forces a re-read
+    return get_repo().load_presets()
+
+
 def _apply_context_to_session(ctx: Context) -> None:
     """Populate Streamlit session_state with values from a Context for all sidebar widgets."""
     st.session_state["stage"] = ctx.stage
@@ -347,9 +354,11 @@ def sidebar_context(default: Context | None = None) -> Context:
     # Presets & Reset controls
     st.sidebar.markdown("---")
     st.sidebar.subheader("Presets")
-    repo = Repository()
-    presets = repo.load_presets()
-    preset_names = [p["name"] for p in presets if isinstance(p, dict) and "name" in p]
+    repo = get_repo()
+    presets = _load_presets(file_version(repo.data_dir / "presets.json"))
+    # load_presets already normalizes entries to {"name", "data"} dicts
+    presets_by_name = {p["name"]: p for p in presets}
+    preset_names = list(presets_by_name)
     col1, col2 = st.sidebar.columns([2, 1])
     with col1:
         preset_name = st.text_input("Preset name", value=st.session_state.get("preset_name", ""), key="preset_name")
@@ -368,7 +377,7 @@ def sidebar_context(default: Context | None = None) -> Context:
                 st.sidebar.warning("Enter a preset name first.")
     sel = st.sidebar.selectbox("Load preset", options=["—"] + preset_names)
     if sel != "—":
-        chosen = next((p for p in presets if p.get("name") == sel), None)
+        chosen = presets_by_name.get(sel)
         data_preview = chosen.get("data") if isinstance(chosen, dict) else None
         with st.sidebar.expander("Preset details"):
             if data_preview:
@@ -391,7 +400,7 @@ def sidebar_context(default: Context | None = None) -> Context:
     with c1:
         if st.button("Apply", use_container_width=True):
             if sel != "—":
-                chosen = next((p for p in presets if p.get("name") == sel), None)
+                chosen = presets_by_name.get(sel)
                 if chosen and "data" in chosen:
                     # Defer application until next run to avoid touching instantiated widgets
                     st.session_state["_pending_ctx"] = chosen["data"]
@@ -105,6 +105,18 @@ def to_vector_row(features: Dict[str, Any]) -> List[float]:
     return [float(features.get(k, 0)) for k in FEATURE_COLUMNS]
 
 
+def to_vector_array(features: Dict[str, Any]):
+    """Feature row as a (1, n_features) float array, ready to pass to predict_proba.
+
+    Build it once when scoring the same features with several models; a fresh array per
+    call keeps concurrent Streamlit sessions from sharing a buffer.
+    """
+    import numpy as np  # type: ignore
+    return np.fromiter(
+        (float(features.get(k, 0)) for k in FEATURE_COLUMNS), dtype=float, count=len(FEATURE_COLUMNS)
+    ).reshape(1, -1)
+
+
 def load_model(model_dir: Path, name: str):
     if joblib is None:
         return None
@@ -120,7 +132,8 @@ def load_model(model_dir: Path, name: str):
 def predict_proba(model, vector: List[float]) -> Optional[Dict[str, float]]:
     try:
         import numpy as np  # type: ignore
-        X = np.array([vector], dtype=float)
+        # Accept a prebuilt (1, n) array from to_vector_array as-is
+        X = vector if isinstance(vector, np.ndarray) and vector.ndim == 2 else np.array([vector], dtype=float)
         probs = model.predict_proba(X)[0]
         classes = list(getattr(model, "classes_", []))
         return {str(c): float(p) for c, p in zip(classes, probs)}
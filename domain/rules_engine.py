@@ -4,10 +4,11 @@ This module has no Streamlit/UI code and can be tested independently.
 """
 from __future__ import annotations
 
-from typing import List, Optional, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any, NamedTuple
 from pathlib import Path
 import json
 from dataclasses import replace
+from functools import lru_cache
 import csv
 from datetime import datetime, timezone
 
@@ -23,7 +24,8 @@ from .tone_matrix import select_tones
 from .segmentation import analyze_units
 from .nudges import generate_nudges
 from .synergy import score_synergy, suggest_gestures
-from .ml_assist import extract_features, to_vector_row, load_model, predict_proba
+from .ml_assist import extract_features, to_vector_array, load_model, predict_proba
+from services.fileio import file_version
 
 MENTALITY_ORDER = [
     Mentality.DEFENSIVE,
@@ -51,13 +53,17 @@ def clamp_mentality(value: int) -> Mentality:
     return VALUE_TO_MENTALITY[value]
 
 
+_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+_ENGINE_CONFIG_FP = _DATA_DIR / "rules" / "normalized" / "engine_config.json"
+
+
 # JSON Configuration Loaders - Replace All Hardcoded Templates
 def _load_config_json(filename: str, default: dict = None) -> dict:
     """Load JSON configuration file with fallback to default."""
     if default is None:
         default = {}
     try:
-        fp = Path(__file__).resolve().parent.parent / "data" / filename
+        fp = _DATA_DIR / filename
         if fp.exists():
             return json.loads(fp.read_text(encoding="utf-8"))
     except Exception:
@@ -84,26 +90,40 @@ def _get_statements() -> dict:
         pass
     return {}
 
+@lru_cache(maxsize=16)
+def _validated_rules(path_str: str, model: type, version: Tuple[int, int]) -> tuple:
+    # The engine only reads rule models, so one validated tuple is shared across recommend() calls
+    try:
+        items = json.loads(Path(path_str).read_text(encoding="utf-8"))
+    except Exception:
+        items = []
+    return tuple(model(**item) for item in items)
+
+def _load_rule_models(filename: str, model: type) -> list:
+    fp = _DATA_DIR / filename
+    version = file_version(fp)
+    if version is None:
+        return []
+    # Keyed on the full path actually read, so repointing _DATA_DIR can't be served another dir's rules
+    return list(_validated_rules(str(fp), model, version))
+
 def _load_base_rules() -> List[PlaybookRule]:
     """Load base rules from JSON configuration - replaces playbook.rules."""
     from domain.models import PlaybookRule
     
-    rules_json = _load_config_json("rules/normalized/base_rules.json", [])
-    return [PlaybookRule(**rule) for rule in rules_json]
+    return _load_rule_models("rules/normalized/base_rules.json", PlaybookRule)
 
 def _load_special_overrides() -> List[SpecialRule]:
     """Load special overrides from JSON configuration - replaces playbook.special."""
     from domain.models import SpecialRule
     
-    special_json = _load_config_json("rules/normalized/special_overrides.json", [])
-    return [SpecialRule(**rule) for rule in special_json]
+    return _load_rule_models("rules/normalized/special_overrides.json", SpecialRule)
 
 def _load_reaction_rules() -> List[ReactionRule]:
     """Load reaction rules from JSON configuration - replaces playbook.reactions."""
     from domain.models import ReactionRule
     
-    reactions_json = _load_config_json("rules/normalized/reaction_rules.json", [])
-    return [ReactionRule(**rule) for rule in reactions_json]
+    return _load_rule_models("rules/normalized/reaction_rules.json", ReactionRule)
 
 def _gesture_tone(gesture: str) -> str:
     """Get tone for gesture from catalogs.json configuration - REPLACES _GESTURE_TONE dict."""
@@ -751,7 +771,38 @@ def apply_live_stats_heuristics(context: Context, rec: Recommendation) -> Recomm
     return result
 
 
-def detect_fav_status(context: Context) -> Tuple[FavStatus, str]:
+class ContextFeatures(NamedTuple):
+    """Table/form values shared by detect_fav_status and detect_matchup_tier.
+
+    pos_delta is None when either table position is unknown.
+    """
+    pos_delta: Optional[int]
+    form_delta: int  # W=+1, D=0, L=-1 over the last five
+    form_points_delta: int  # W=3, D=1, L=0 over the last five
+
+
+def _form_points(s: Optional[str]) -> int:
+    if not s:
+        return 0
+    pts = 0
+    for c in s[:5].upper():
+        pts += 3 if c == 'W' else (1 if c == 'D' else 0)
+    return pts
+
+
+def derive_context_features(context: Context) -> ContextFeatures:
+    """Parse positions and form strings once so callers can reuse them across detectors."""
+    pos_delta = None
+    if context.team_position is not None and context.opponent_position is not None:
+        pos_delta = context.opponent_position - context.team_position
+    return ContextFeatures(
+        pos_delta=pos_delta,
+        form_delta=_score_form(context.team_form) - _score_form(context.opponent_form),
+        form_points_delta=_form_points(context.team_form) - _form_points(context.opponent_form),
+    )
+
+
+def detect_fav_status(context: Context, feats: Optional[ContextFeatures] = None) -> Tuple[FavStatus, str]:
     """Infer Favourite/Underdog using config-driven weights and thresholds.
 
     Config file: data/rules/normalized/engine_config.json
@@ -771,11 +822,25 @@ def detect_fav_status(context: Context) -> Tuple[FavStatus, str]:
           }
         }
       }
+
+    Pass feats (from derive_context_features) to reuse already-parsed positions/form.
     """
-    # Load config once per call (file IO is fine here; could be cached later)
+    if feats is None:
+        feats = derive_context_features(context)
+    return _fav_status(feats.pos_delta, feats.form_delta, context.venue, str(_ENGINE_CONFIG_FP), file_version(_ENGINE_CONFIG_FP))
+
+
+@lru_cache(maxsize=64)
+def _fav_status(
+    pos_delta: Optional[int],
+    form_delta: int,
+    venue: Venue,
+    cfg_path: str,
+    cfg_version: Optional[Tuple[int, int]],
+) -> Tuple[FavStatus, str]:
+    """Scoring behind detect_fav_status, memoized on its inputs and the config file path and version."""
     try:
-        cfg_fp = Path(__file__).resolve().parent.parent / "data" / "rules" / "normalized" / "engine_config.json"
-        cfg = json.loads(cfg_fp.read_text(encoding="utf-8")) if cfg_fp.exists() else {}
+        cfg = json.loads(Path(cfg_path).read_text(encoding="utf-8")) if cfg_version is not None else {}
         fav_cfg = cfg.get("favourite_detection", {})
     except Exception:
         fav_cfg = {}
@@ -795,8 +860,7 @@ def detect_fav_status(context: Context) -> Tuple[FavStatus, str]:
     parts: List[str] = []
 
     # Position component: positive if team significantly above opponent
-    if context.team_position is not None and context.opponent_position is not None:
-        pos_delta = context.opponent_position - context.team_position
+    if pos_delta is not None:
         if pos_delta >= pos_gap_threshold:
             score += pos_weight
             parts.append(f"pos +{pos_weight}")
@@ -809,7 +873,6 @@ def detect_fav_status(context: Context) -> Tuple[FavStatus, str]:
         parts.append("pos ?")
 
     # Form component
-    form_delta = _score_form(context.team_form) - _score_form(context.opponent_form)
     if form_delta >= form_diff_threshold:
         score += form_weight
         parts.append(f"form +{form_weight}")
@@ -820,7 +883,7 @@ def detect_fav_status(context: Context) -> Tuple[FavStatus, str]:
         parts.append("form 0")
 
     # Venue component
-    if context.venue == Venue.HOME:
+    if venue == Venue.HOME:
         score += home_bonus
         parts.append(f"home +{home_bonus}")
     else:
@@ -828,8 +891,7 @@ def detect_fav_status(context: Context) -> Tuple[FavStatus, str]:
         parts.append(f"away -{away_penalty}")
 
     # Special away constraints
-    if context.venue == Venue.AWAY and context.team_position is not None and context.opponent_position is not None:
-        pos_delta = context.opponent_position - context.team_position
+    if venue == Venue.AWAY and pos_delta is not None:
         # If we're worse by N+ positions away, never favourite
         if never_fav_away_if_pos_gap_disadv_ge and (-pos_delta) >= never_fav_away_if_pos_gap_disadv_ge:
             fav = FavStatus.UNDERDOG
@@ -849,16 +911,40 @@ def detect_fav_status(context: Context) -> Tuple[FavStatus, str]:
     return fav, explanation
 
 
-def detect_matchup_tier(context: Context) -> Tuple[FavTier, float, str]:
+def detect_matchup_tier(context: Context, feats: Optional[ContextFeatures] = None) -> Tuple[FavTier, float, str]:
     """Compute a granular advantage score and map to a FavTier.
 
     Uses advantage_model from engine_config.json combining table context and live stats.
-    Returns (tier, score, explanation).
+    Returns (tier, score, explanation). Pass feats to reuse already-parsed positions/form.
     """
+    if feats is None:
+        feats = derive_context_features(context)
+    cfg_version = file_version(_ENGINE_CONFIG_FP)
+    # recommend() asks for the tier from several stages; its inputs don't change in between
+    return _matchup_tier(
+        feats.pos_delta, feats.form_points_delta, context.venue,
+        context.xg_for, context.xg_against, context.shots_for, context.shots_against,
+        context.possession_pct, str(_ENGINE_CONFIG_FP), cfg_version,
+    )
+
+
+@lru_cache(maxsize=64)
+def _matchup_tier(
+    pos_delta: Optional[int],
+    form_delta: int,
+    venue: Venue,
+    xg_for: Optional[float],
+    xg_against: Optional[float],
+    shots_for: Optional[int],
+    shots_against: Optional[int],
+    possession_pct: Optional[float],
+    cfg_path: str,
+    cfg_version: Optional[Tuple[int, int]],
+) -> Tuple[FavTier, float, str]:
+    """Score/tier math behind detect_matchup_tier, memoized on its inputs and the config file path and version."""
     # Load model config
     try:
-        cfg_fp = Path(__file__).resolve().parent.parent / "data" / "rules" / "normalized" / "engine_config.json"
-        cfg = json.loads(cfg_fp.read_text(encoding="utf-8")) if cfg_fp.exists() else {}
+        cfg = json.loads(Path(cfg_path).read_text(encoding="utf-8")) if cfg_version is not None else {}
         m = cfg.get("advantage_model", {})
     except Exception:
         m = {}
@@ -883,24 +969,15 @@ def detect_matchup_tier(context: Context) -> Tuple[FavTier, float, str]:
     score = 0.0
 
     # Table position differential (positive if we're better placed)
-    if context.team_position is not None and context.opponent_position is not None:
-        pos_delta = context.opponent_position - context.team_position
+    if pos_delta is not None:
         score += w_pos * (pos_delta / 4.0)  # scale: 4 places ≈ 1 point
         parts.append(f"posΔ {pos_delta}×{w_pos}")
     # Form differential: W=3, D=1, L=0
-    def _form_points(s: Optional[str]) -> int:
-        if not s:
-            return 0
-        pts = 0
-        for c in s[:5].upper():
-            pts += 3 if c == 'W' else (1 if c == 'D' else 0)
-        return pts
-    form_delta = _form_points(context.team_form) - _form_points(context.opponent_form)
     score += w_form * (form_delta / 5.0)  # scale: 5 pts ≈ 1 point
     parts.append(f"formΔ {form_delta}×{w_form}")
 
     # Venue factor
-    if context.venue == Venue.HOME:
+    if venue == Venue.HOME:
         score += w_home
         parts.append(f"home +{w_home}")
     else:
@@ -908,18 +985,18 @@ def detect_matchup_tier(context: Context) -> Tuple[FavTier, float, str]:
         parts.append(f"away {w_away}")
 
     # Live stats (if present)
-    if context.xg_for is not None and context.xg_against is not None:
-        xg_delta = (context.xg_for - context.xg_against)
+    if xg_for is not None and xg_against is not None:
+        xg_delta = (xg_for - xg_against)
         score += w_xg * xg_delta
         parts.append(f"xgΔ {round(xg_delta,2)}×{w_xg}")
-    if context.shots_for is not None and context.shots_against is not None:
-        shots_delta = (context.shots_for - context.shots_against) / 5.0
+    if shots_for is not None and shots_against is not None:
+        shots_delta = (shots_for - shots_against) / 5.0
         score += w_shots * shots_delta
-        parts.append(f"shotsΔ {context.shots_for - context.shots_against}×{w_shots}/5")
-    if context.possession_pct is not None:
-        poss_delta = (context.possession_pct - 50.0) / 20.0
+        parts.append(f"shotsΔ {shots_for - shots_against}×{w_shots}/5")
+    if possession_pct is not None:
+        poss_delta = (possession_pct - 50.0) / 20.0
         score += w_poss * poss_delta
-        parts.append(f"possΔ {int(context.possession_pct)-50}%×{w_poss}/20")
+        parts.append(f"possΔ {int(possession_pct)-50}%×{w_poss}/20")
 
     # Clamp
     score = max(-cap, min(cap, score))
@@ -1209,8 +1286,13 @@ def apply_reaction_adjustments(context: Context, rec: Recommendation, reactions:
     return result
 
 
-def recommend(context: Context) -> Optional[Recommendation]:
-    """Compute recommendation end-to-end using JSON-driven configuration."""
+def recommend(context: Context, feats: Optional[ContextFeatures] = None) -> Optional[Recommendation]:
+    """Compute recommendation end-to-end using JSON-driven configuration.
+
+    feats (from derive_context_features) is reused for the up-front fav/tier detection.
+    """
+    if feats is None:
+        feats = derive_context_features(context)
     # If numeric score provided, derive score_state for rule matching
     if context.team_goals is not None and context.opponent_goals is not None:
         if context.team_goals > context.opponent_goals:
@@ -1223,11 +1305,11 @@ def recommend(context: Context) -> Optional[Recommendation]:
     # Auto-detect favourite/underdog based on simple heuristic
     fav_explanation: Optional[str] = None
     if context.auto_fav_status:
-        fav, fav_explanation = detect_fav_status(context)
+        fav, fav_explanation = detect_fav_status(context, feats)
         context.fav_status = fav
     # Compute matchup tier/edge upfront for transparency (used in traces/notes)
     try:
-        _tier_now, _edge_now, _tier_expl = detect_matchup_tier(context)
+        _tier_now, _edge_now, _tier_expl = detect_matchup_tier(context, feats)
     except Exception:
         _tier_now, _edge_now, _tier_expl = None, None, None
     
@@ -1345,6 +1427,9 @@ def recommend(context: Context) -> Optional[Recommendation]:
     # Default talk audience to Team at talk stages if not set
     if context.stage in (MatchStage.PRE_MATCH, MatchStage.HALF_TIME, MatchStage.FULL_TIME) and not final.talk_audience:
         final.talk_audience = TalkAudience.TEAM
+    # Callers read rec.shout.value directly, so never hand back a bare string
+    if not isinstance(final.shout, Shout):
+        final.shout = Shout(final.shout)
     # Optional ML feature logging (pre-ML)
     try:
         _maybe_log_ml_features(context, final, ab_stage="pre-ml")
@@ -1414,7 +1499,7 @@ def _maybe_log_ml_features(context: Context, rec: Recommendation, ab_stage: str
         "edge": edge if edge is not None else "",
         "mentality": rec.mentality.value,
         "gesture": rec.gesture,
-        "shout": rec.shout.value if hasattr(rec.shout, 'value') else str(rec.shout),
+        "shout": rec.shout.value,
         "talk": rec.team_talk or "",
         "ab_stage": ab_stage,
         # ML metadata (may be empty on pre-ml)
@@ -1464,7 +1549,8 @@ def _maybe_apply_ml_inference(context: Context, rec: Recommendation, edge: Optio
     except Exception:
         tier_val = None
     feats = extract_features(context, tier_val, edge)
-    vec = to_vector_row(feats)
+    # One array shared by the gesture and shout models
+    vec = to_vector_array(feats)
     out = replace(rec)
     # Gesture inference
     g_model = load_model(model_dir, "gesture")
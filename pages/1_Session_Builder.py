@@ -58,7 +58,13 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-sm = SessionManager()
+@st.cache_resource(show_spinner=False)
+def _session_manager() -> SessionManager:
+    """One SessionManager per process, so its in-memory snapshot of active.json survives reruns."""
+    return SessionManager()
+
+
+sm = _session_manager()
 
 # Utilities
 def has_decision(events: List[Dict[str, Any]], stage: MatchStage) -> bool:
@@ -975,8 +981,6 @@ with tabs[5]:
             st.info("You can start a new session in Pre-Match.")
     with cols[1]:
         if st.button("Cancel Active Session", type="secondary"):
-            from services.session import ACTIVE_FILE
-            if ACTIVE_FILE.exists():
-                ACTIVE_FILE.unlink(missing_ok=True)
+            sm.cancel()
             st.warning("Active session cancelled.")
             st.rerun()
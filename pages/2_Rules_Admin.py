@@ -1,19 +1,34 @@
-import json
+import hashlib
+from dataclasses import astuple
+import pandas as pd
 import streamlit as st
 from pathlib import Path
+from typing import Callable
 
-from services.repository import Repository
+from services import jsonio
+from services.fileio import atomic_write, file_version
+from services.repository import get_repo
 from domain.models import (
     MatchStage, ScoreState, FavStatus, Venue, Context
 )
-from domain.rules_engine import detect_fav_status, detect_matchup_tier, recommend
-from domain.ml_assist import load_model, extract_features, to_vector_row, predict_proba
+from domain.rules_engine import detect_fav_status, detect_matchup_tier, derive_context_features, recommend
+from domain.ml_assist import load_model, extract_features, to_vector_array, predict_proba
+
+# Enum value lists used by selectboxes and the statements editors, built once at import
+_SCORE_STATES = tuple(s.value for s in ScoreState)
+_FAV_STATUSES = tuple(f.value for f in FavStatus)
+_MATCH_STAGES = tuple(s.value for s in MatchStage)
+# Regular-time stages (no extra time) offered by the rule hit preview
+_REGULAR_STAGES = tuple(
+    s.value for s in MatchStage
+    if s in (MatchStage.PRE_MATCH, MatchStage.EARLY, MatchStage.MID, MatchStage.LATE, MatchStage.VERY_LATE, MatchStage.HALF_TIME, MatchStage.FULL_TIME)
+)
 
 st.title("🧱 Rules Admin — Minimal Tables")
 st.caption("Only the three granular tables: Gestures, Statements, and Gesture↔Statements links.")
 
 st.divider()
-repo = Repository()
+repo = get_repo()
 try:
     gestures_map = repo.load_gestures()
 except Exception:
@@ -25,66 +40,220 @@ st.caption("Edit only: Gestures, Statements, and Gesture↔Statements links.")
 
 # Normalized storage paths
 norm_dir = Path(__file__).resolve().parents[1] / "data" / "rules" / "normalized"
-norm_dir.mkdir(parents=True, exist_ok=True)
+if not st.session_state.get("_rules_norm_dir_ready"):
+    norm_dir.mkdir(parents=True, exist_ok=True)
+    st.session_state["_rules_norm_dir_ready"] = True
 catalogs_fp = norm_dir / "catalogs.json"
 statements_fp = norm_dir / "statements.json"
 gesture_statements_fp = norm_dir / "gesture_statements.json"
 shouts_fp = norm_dir / "shouts.json"
 shout_rules_fp = norm_dir / "shout_rules.json"
-shouts_fp = norm_dir / "shouts.json"
-shout_rules_fp = norm_dir / "shout_rules.json"
 
-def _load_json_or(default: dict, fp: Path) -> dict:
+@st.cache_data(show_spinner=False)
+def _load_cached(path_str: str, version: tuple) -> tuple:
+    # version is only part of the cache key: saves change it and force a re-read
+    raw = Path(path_str).read_bytes()
+    return raw, jsonio.loads(raw)
+
+# Raw bytes of each file as loaded or written during this run; the export buttons serve these
+_serialized: dict = {}
+
+def _load_json_or(default_factory: Callable[[], dict], fp: Path) -> dict:
+    # Dicts loaded on an earlier rerun of this session are reused while the file is untouched,
+    # skipping the cache lookup (and the copy st.cache_data hands back) on every widget interaction
+    loaded = st.session_state.setdefault("_rules_loaded", {})
     try:
-        if fp.exists():
-            return json.loads(fp.read_text(encoding="utf-8"))
+        version = file_version(fp)
+        if version is not None:
+            hit = loaded.get(str(fp))
+            if hit is None or hit[0] != version:
+                raw, data = _load_cached(str(fp), version)
+                hit = loaded[str(fp)] = (version, raw, data)
+            _serialized[fp] = hit[1]
+            return hit[2]
     except Exception:
         pass
-    return json.loads(json.dumps(default))
+    return default_factory()
+
+@st.cache_data(show_spinner=False)
+def _pretty(raw: bytes) -> bytes:
+    """Indented copy of a stored JSON file for the export downloads."""
+    return jsonio.dumps(jsonio.loads(raw), indent=True)
+
+def _atomic_write(fp: Path, data: bytes) -> None:
+    """atomic_write plus dropping this page's cached copies of the file."""
+    atomic_write(fp, data)
+    _serialized[fp] = data
+    st.session_state.get("_rules_loaded", {}).pop(str(fp), None)
+
+def _write_if_changed(fp: Path, data: bytes) -> bool:
+    """Write data to fp unless the file already holds exactly these bytes."""
+    if fp.exists() and fp.read_bytes() == data:
+        return False
+    _atomic_write(fp, data)
+    return True
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _model_status(model_dir: str) -> tuple:
+    """(gesture model present, shout model present); the short TTL picks up newly trained models."""
+    p = Path(model_dir)
+    return (p / "gesture.joblib").exists(), (p / "shout.joblib").exists()
+
+@st.cache_resource(show_spinner=False)
+def _load_model_cached(model_dir: str, name: str, version: tuple):
+    # version is only part of the cache key: retraining replaces the file and forces a reload
+    return load_model(Path(model_dir), name)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _predict_cached(model_dir: str, versions: tuple, feats: dict) -> dict:
+    # Keyed on each model's file version plus the features, so repeat validations skip inference;
+    # the feature array is built once and scored by every model
+    X = to_vector_array(feats)
+    out = {}
+    for name, version in versions:
+        model = _load_model_cached(model_dir, name, version)
+        out[name] = predict_proba(model, X) if model else None
+    return out
+
+def _models_proba(model_dir: Path, names: tuple, feats: dict) -> dict:
+    """{name: class probabilities or None} for the trained models among names."""
+    versions = tuple((name, file_version(model_dir / f"{name}.joblib")) for name in names)
+    versions = tuple(v for v in versions if v[1] is not None)  # None means the model file is missing
+    if not versions:
+        return {}
+    return _predict_cached(str(model_dir), versions, feats)
+
+def _rules_version() -> tuple:
+    """(name, file version) of every normalized rules file; changes whenever any of them is saved."""
+    return tuple(sorted((fp.name, file_version(fp)) for fp in norm_dir.glob("*.json")))
 
+def _nonempty_lines(txt: str) -> list:
+    """Stripped non-empty lines of txt, stripping each line once."""
+    return [t for t in (ln.strip() for ln in txt.splitlines()) if t]
+
+def _parse_lines(txt: str, key: str) -> list:
+    """Split a text_area value into stripped non-empty lines, reusing the last parse if unchanged."""
+    cache = st.session_state.setdefault("_parsed_lines", {})
+    prev = cache.get(key)
+    if prev is not None and prev[0] == txt:
+        return prev[1]
+    parsed = _nonempty_lines(txt)
+    cache[key] = (txt, parsed)
+    return parsed
+
+def _flatten_statements(statements: dict) -> dict:
+    """Flatten {stage: {gesture: [..]}} / {stage: {score: {gesture: [..]}}} into {(stage, score, gesture): [..]}.
+
+    PreMatch has no score level, so its keys carry score=None.
+    """
+    flat = {}
+    for stage, section in statements.items():
+        if not isinstance(section, dict):
+            continue
+        for k, v in section.items():
+            if isinstance(v, dict):
+                for g, lines in v.items():
+                    flat[(stage, k, g)] = lines
+            else:
+                flat[(stage, None, k)] = v
+    return flat
+
+def _statements_editor(key: str, flat: dict, stage: str, gestures: list, scores, disabled: bool) -> dict:
+    """Edit one statements section as a single long-form table (one row per statement).
+
+    A single data_editor replaces the per-gesture text_areas; rows are read from the
+    flattened statements map and folded back into the stored shape
+    ({gesture: [..]} or {score: {gesture: [..]}}).
+    """
+    cols = (["Score"] if scores else []) + ["Gesture", "Statement"]
+    if scores:
+        rows = [(sc, g, line) for sc in scores for g in gestures for line in flat.get((stage, sc, g), [])]
+    else:
+        rows = [(g, line) for g in gestures for line in flat.get((stage, None, g), [])]
+    column_config = {
+        "Gesture": st.column_config.SelectboxColumn("Gesture", options=gestures, required=True),
+        "Statement": st.column_config.TextColumn("Statement", required=True, width="large"),
+    }
+    if scores:
+        column_config["Score"] = st.column_config.SelectboxColumn("Score", options=scores, required=True)
+    edited = st.data_editor(
+        pd.DataFrame(rows, columns=cols),
+        key=key,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config=column_config,
+        disabled=disabled,
+    )
+    if scores:
+        out = {sc: {g: [] for g in gestures} for sc in scores}
+        for sc, g, text in edited[cols].itertuples(index=False):
+            text = text.strip() if isinstance(text, str) else ""
+            if text and sc in out and g in out[sc]:
+                out[sc][g].append(text)
+        return out
+    out = {g: [] for g in gestures}
+    for g, text in edited[cols].itertuples(index=False):
+        text = text.strip() if isinstance(text, str) else ""
+        if text and g in out:
+            out[g].append(text)
+    return out
+
+# Defaults are built by factories so they are only constructed when a file is missing.
 # Defaults seeded from gestures.json (tones inferred from keys) or a standard tone set
-default_catalogs = {
-    "tones": list(gestures_map.keys()) or ["calm", "assertive", "motivational", "relaxed", "aggressive"],
-    "gestures": gestures_map or {
-        "calm": [],
-        "assertive": [],
-        "motivational": [],
-        "relaxed": [],
-        "aggressive": [],
-    },
-}
+def default_catalogs() -> dict:
+    return {
+        "tones": list(gestures_map.keys()) or ["calm", "assertive", "motivational", "relaxed", "aggressive"],
+        "gestures": gestures_map or {
+            "calm": [],
+            "assertive": [],
+            "motivational": [],
+            "relaxed": [],
+            "aggressive": [],
+        },
+    }
 catalogs = _load_json_or(default_catalogs, catalogs_fp)
 
 # Load shouts configuration
-default_shouts = {
-    "available_shouts": ["Encourage", "Demand More", "Focus", "Fire Up", "Praise", "None"],
-    "shout_contexts": {},
-    "cooldown_rules": {"same_shout_minutes": 8, "max_shouts_per_half": 6},
-    "tone_mapping": {}
-}
+def default_shouts() -> dict:
+    return {
+        "available_shouts": ["Encourage", "Demand More", "Focus", "Fire Up", "Praise", "None"],
+        "shout_contexts": {},
+        "cooldown_rules": {"same_shout_minutes": 8, "max_shouts_per_half": 6},
+        "tone_mapping": {}
+    }
 shouts_config = _load_json_or(default_shouts, shouts_fp)
 
-default_shout_rules = {
-    "context_rules": {},
-    "suppression_rules": {},
-    "tone_selection": {}
-}
+def default_shout_rules() -> dict:
+    return {
+        "context_rules": {},
+        "suppression_rules": {},
+        "tone_selection": {}
+    }
 shout_rules = _load_json_or(default_shout_rules, shout_rules_fp)
 
-default_statements = {
-    "PreMatch": {tone: [] for tone in catalogs.get("tones", [])},
-    "HalfTime": {sc.value: {tone: [] for tone in catalogs.get("tones", [])} for sc in ScoreState},
-    "FullTime": {sc.value: {tone: [] for tone in catalogs.get("tones", [])} for sc in ScoreState},
-}
+def default_statements() -> dict:
+    tones = catalogs.get("tones", [])
+    return {
+        "PreMatch": {tone: [] for tone in tones},
+        "HalfTime": {sc.value: {tone: [] for tone in tones} for sc in ScoreState},
+        "FullTime": {sc.value: {tone: [] for tone in tones} for sc in ScoreState},
+    }
 statements = _load_json_or(default_statements, statements_fp)
+# Sections staged in the Statements tab are kept apart from the loaded dict until Save All writes them
+_staged_statements = st.session_state.get("_staged_statements")
+if _staged_statements:
+    statements = {**statements, **_staged_statements}
+flat_statements = _flatten_statements(statements)
 
 # Mapping: which statements are allowed for each gesture at each stage/score per tone.
 # Stored as indices into the statements lists so it remains stable if texts are edited.
-default_gesture_statements = {
-    "PreMatch": {},
-    "HalfTime": {sc.value: {} for sc in ScoreState},
-    "FullTime": {sc.value: {} for sc in ScoreState},
-}
+def default_gesture_statements() -> dict:
+    return {
+        "PreMatch": {},
+        "HalfTime": {sc.value: {} for sc in ScoreState},
+        "FullTime": {sc.value: {} for sc in ScoreState},
+    }
 gesture_statements = _load_json_or(default_gesture_statements, gesture_statements_fp)
 
 tab_g, tab_s, tab_sh, tab_cfg = st.tabs(["Gestures", "Statements", "Shouts", "Engine Config"])
@@ -107,22 +276,24 @@ with tab_g:
     st.caption("💡 Add one gesture per line for each tone. These are the physical actions/expressions your manager can make.")
     
     new_gestures_map = {}
-    tone_list = [ln.strip() for ln in tones.splitlines() if ln.strip()] or catalogs.get("tones", [])
+    tone_list = _parse_lines(tones, "tones_list") or catalogs.get("tones", [])
+    gestures_by_tone = catalogs.get("gestures") or {}
     for tone in tone_list:
-        default_lines = catalogs.get("gestures", {}).get(tone, [])
+        default_lines = gestures_by_tone.get(tone, [])
         txt = st.text_area(f"{tone} gestures", 
                           value="\n".join(default_lines),
                           help=f"Enter {tone} gestures, one per line (e.g., 'Nod approvingly', 'Point to the pitch')",
                           disabled=not edit_g)
-        new_gestures_map[tone] = [ln.strip() for ln in txt.splitlines() if ln.strip()]
+        new_gestures_map[tone] = _parse_lines(txt, f"gestures_{tone}")
     if st.button("Save gestures", disabled=not edit_g):
         try:
-            catalogs.update({
-                "tones": tone_list,
-                "gestures": new_gestures_map,
-            })
-            catalogs_fp.write_text(json.dumps(catalogs, indent=2, ensure_ascii=False), encoding="utf-8")
-            st.success("Gestures saved")
+            # Build a new dict: the loaded one is held in session state and must only change once saved
+            new_catalogs = {**catalogs, "tones": tone_list, "gestures": new_gestures_map}
+            if _write_if_changed(catalogs_fp, jsonio.dumps(new_catalogs)):
+                catalogs = new_catalogs
+                st.success("Gestures saved")
+            else:
+                st.info("No changes to save")
         except Exception as e:
             st.error(f"Failed to save gestures: {e}")
 
@@ -135,96 +306,73 @@ with tab_s:
     )
     tones_list = catalogs.get("tones", [])
     
-    # Initialize all sections
+    # Initialize all sections; each editor is only built when its toggle is on
     new_pm = {}
     new_ht = {}
     new_ft = {}
+    # Gesture list is shared by all three sections; build it once per rerun
+    gestures_all = sorted({g for arr in catalogs.get("gestures", {}).values() for g in arr})
+    all_gestures = ["No Gesture"] + [g for g in gestures_all if g != "No Gesture"]
     
     # PreMatch Section
-    with st.expander("🎯 PreMatch Statements", expanded=False):
-        st.info("📝 **Instructions:** Enter one statement per line. These are things your manager says before the match starts, organized by gesture.")
-        st.markdown("##### PreMatch by gesture")
-        gestures_all = sorted({g for arr in catalogs.get("gestures", {}).values() for g in arr})
-        all_gestures = ["No Gesture"] + [g for g in gestures_all if g != "No Gesture"]
-        for i, gesture in enumerate(all_gestures):
-            txt = st.text_area(f"PreMatch • {gesture}", 
-                              value="\n".join(statements.get("PreMatch", {}).get(gesture, [])), 
-                              key=f"pm_gesture_{i}_{gesture.replace(' ', '_').replace('-', '_')}",
-                              help=f"Enter statements available when using '{gesture}' gesture, one per line",
-                              disabled=not edit_s)
-            new_pm[gesture] = [ln.strip() for ln in txt.splitlines() if ln.strip()]
+    show_pm = st.checkbox("Show PreMatch editor", value=False, key="show_pm")
+    if show_pm:
+        with st.expander("🎯 PreMatch Statements", expanded=True):
+            st.info("📝 **Instructions:** Add one row per statement. These are things your manager says before the match starts, organized by gesture.")
+            st.markdown("##### PreMatch by gesture")
+            new_pm = _statements_editor("pm_editor", flat_statements, "PreMatch", all_gestures, None, disabled=not edit_s)
         
-        if st.button("Save PreMatch", key="save_pm", disabled=not edit_s):
-            try:
-                statements["PreMatch"] = new_pm
-                statements_fp.write_text(json.dumps(statements, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("PreMatch statements saved")
-            except Exception as e:
-                st.error(f"Failed to save PreMatch statements: {e}")
+            if st.button("Stage PreMatch", key="save_pm", disabled=not edit_s):
+                st.session_state.setdefault("_staged_statements", {})["PreMatch"] = new_pm
+                st.success("PreMatch statements staged")
     
     # HalfTime Section
-    with st.expander("⏰ HalfTime Statements", expanded=False):
-        st.info("📝 **Instructions:** Enter one statement per line. These are things your manager says at half-time based on score situation and gesture.")
-        st.markdown("##### HalfTime by score and gesture")
-        gestures_all = sorted({g for arr in catalogs.get("gestures", {}).values() for g in arr})
-        all_gestures = ["No Gesture"] + [g for g in gestures_all if g != "No Gesture"]
-        for sc in [s.value for s in ScoreState]:
-            st.markdown(f"**{sc}**")
-            row = {}
-            for i, gesture in enumerate(all_gestures):
-                key = f"HT • {sc} • {gesture}"
-                txt = st.text_area(key, 
-                                  value="\n".join(((statements.get("HalfTime", {}).get(sc, {}) or {}).get(gesture, []))), 
-                                  key=f"ht_{sc}_gesture_{i}_{gesture.replace(' ', '_').replace('-', '_')}",
-                                  help=f"Enter statements available when {sc.lower()} and using '{gesture}' gesture, one per line",
-                                  disabled=not edit_s)
-                row[gesture] = [ln.strip() for ln in txt.splitlines() if ln.strip()]
-            new_ht[sc] = row
+    show_ht = st.checkbox("Show HalfTime editor", value=False, key="show_ht")
+    if show_ht:
+        with st.expander("⏰ HalfTime Statements", expanded=True):
+            st.info("📝 **Instructions:** Add one row per statement. These are things your manager says at half-time based on score situation and gesture.")
+            st.markdown("##### HalfTime by score and gesture")
+            new_ht = _statements_editor("ht_editor", flat_statements, "HalfTime", all_gestures, _SCORE_STATES, disabled=not edit_s)
         
-        if st.button("Save HalfTime", key="save_ht", disabled=not edit_s):
-            try:
-                statements["HalfTime"] = new_ht
-                statements_fp.write_text(json.dumps(statements, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("HalfTime statements saved")
-            except Exception as e:
-                st.error(f"Failed to save HalfTime statements: {e}")
+            if st.button("Stage HalfTime", key="save_ht", disabled=not edit_s):
+                st.session_state.setdefault("_staged_statements", {})["HalfTime"] = new_ht
+                st.success("HalfTime statements staged")
     
     # FullTime Section
-    with st.expander("🏁 FullTime Statements", expanded=False):
-        st.info("📝 **Instructions:** Enter one statement per line. These are things your manager says after the match based on final result and gesture.")
-        st.markdown("##### FullTime by score and gesture")
-        gestures_all = sorted({g for arr in catalogs.get("gestures", {}).values() for g in arr})
-        all_gestures = ["No Gesture"] + [g for g in gestures_all if g != "No Gesture"]
-        for sc in [s.value for s in ScoreState]:
-            st.markdown(f"**{sc}**")
-            row = {}
-            for i, gesture in enumerate(all_gestures):
-                key = f"FT • {sc} • {gesture}"
-                txt = st.text_area(key, 
-                                  value="\n".join(((statements.get("FullTime", {}).get(sc, {}) or {}).get(gesture, []))), 
-                                  key=f"ft_{sc}_gesture_{i}_{gesture.replace(' ', '_').replace('-', '_')}",
-                                  help=f"Enter statements available after {sc.lower()} and using '{gesture}' gesture, one per line",
-                                  disabled=not edit_s)
-                row[gesture] = [ln.strip() for ln in txt.splitlines() if ln.strip()]
-            new_ft[sc] = row
+    show_ft = st.checkbox("Show FullTime editor", value=False, key="show_ft")
+    if show_ft:
+        with st.expander("🏁 FullTime Statements", expanded=True):
+            st.info("📝 **Instructions:** Add one row per statement. These are things your manager says after the match based on final result and gesture.")
+            st.markdown("##### FullTime by score and gesture")
+            new_ft = _statements_editor("ft_editor", flat_statements, "FullTime", all_gestures, _SCORE_STATES, disabled=not edit_s)
         
-        if st.button("Save FullTime", key="save_ft", disabled=not edit_s):
-            try:
-                statements["FullTime"] = new_ft
-                statements_fp.write_text(json.dumps(statements, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("FullTime statements saved")
-            except Exception as e:
-                st.error(f"Failed to save FullTime statements: {e}")
+            if st.button("Stage FullTime", key="save_ft", disabled=not edit_s):
+                st.session_state.setdefault("_staged_statements", {})["FullTime"] = new_ft
+                st.success("FullTime statements staged")
     
-    # Save All Button
+    # Save All Button: the only place statements.json is written, so staged sections are encoded once
     st.divider()
+    staged = st.session_state.get("_staged_statements")
+    if staged:
+        st.info(f"Staged {', '.join(sorted(staged))} changes are not written yet - click Save All Statements to save them.")
     if st.button("💾 Save All Statements", key="save_all", disabled=not edit_s):
         try:
-            statements["PreMatch"] = new_pm
-            statements["HalfTime"] = new_ht
-            statements["FullTime"] = new_ft
-            statements_fp.write_text(json.dumps(statements, indent=2, ensure_ascii=False), encoding="utf-8")
-            st.success("All statements saved")
+            # Build a new dict, only overwriting sections whose editors were rendered this run;
+            # the loaded one and the staged sections are only replaced once the write succeeds
+            new_statements = dict(statements)
+            if show_pm:
+                new_statements["PreMatch"] = new_pm
+            if show_ht:
+                new_statements["HalfTime"] = new_ht
+            if show_ft:
+                new_statements["FullTime"] = new_ft
+            changed = _write_if_changed(statements_fp, jsonio.dumps(new_statements))
+            statements = new_statements
+            st.session_state.pop("_staged_statements", None)
+            if changed:
+                st.success("All statements saved")
+            else:
+                st.info("No changes to save")
         except Exception as e:
             st.error(f"Failed to save statements: {e}")
 
@@ -242,22 +390,29 @@ with tab_sh:
         st.markdown("##### Configure when each shout works best")
         
         available_shouts = shouts_config.get("available_shouts", ["Encourage", "Demand More", "Focus", "Fire Up", "Praise", "None"])
+        # (description, best_when, avoid_when) widget keys per shout, built once per rerun
+        shout_keys = {
+            shout: tuple(f"shout_{part}_{shout.replace(' ', '_')}" for part in ("desc", "best", "avoid"))
+            for shout in available_shouts
+        }
         
+        contexts_map = shouts_config.get("shout_contexts") or {}
         new_contexts = {}
         for shout in available_shouts:
             if shout == "None":
                 continue
+            desc_key, best_key, avoid_key = shout_keys[shout]
                 
             st.markdown(f"**{shout}**")
             col1, col2 = st.columns(2)
             
-            current_context = shouts_config.get("shout_contexts", {}).get(shout, {})
+            current_context = contexts_map.get(shout, {})
             
             with col1:
                 description = st.text_input(
                     f"Description", 
                     value=current_context.get("description", ""),
-                    key=f"shout_desc_{shout.replace(' ', '_')}",
+                    key=desc_key,
                     help=f"What does {shout} do?",
                     disabled=not edit_sh
                 )
@@ -265,7 +420,7 @@ with tab_sh:
                 best_when = st.text_area(
                     f"Best when (one per line)",
                     value="\n".join(current_context.get("best_when", [])),
-                    key=f"shout_best_{shout.replace(' ', '_')}",
+                    key=best_key,
                     help=f"Contexts where {shout} works well",
                     disabled=not edit_sh
                 )
@@ -274,15 +429,15 @@ with tab_sh:
                 avoid_when = st.text_area(
                     f"Avoid when (one per line)",
                     value="\n".join(current_context.get("avoid_when", [])),
-                    key=f"shout_avoid_{shout.replace(' ', '_')}",
+                    key=avoid_key,
                     help=f"Contexts where {shout} should not be used",
                     disabled=not edit_sh
                 )
             
             new_contexts[shout] = {
                 "description": description,
-                "best_when": [line.strip() for line in best_when.splitlines() if line.strip()],
-                "avoid_when": [line.strip() for line in avoid_when.splitlines() if line.strip()]
+                "best_when": _parse_lines(best_when, best_key),
+                "avoid_when": _parse_lines(avoid_when, avoid_key)
             }
     
     # Tone Mapping for Shouts
@@ -291,10 +446,11 @@ with tab_sh:
         st.caption("Select which shouts are compatible with each tone. This determines shout selection during matches.")
         
         tones_list = catalogs.get("tones", [])
+        tone_mapping = shouts_config.get("tone_mapping") or {}
         new_tone_mapping = {}
         
         for tone in tones_list:
-            current_mapping = shouts_config.get("tone_mapping", {}).get(tone, [])
+            current_mapping = tone_mapping.get(tone, [])
             selected_shouts = st.multiselect(
                 f"{tone.title()} tone → Available shouts",
                 options=available_shouts,
@@ -400,15 +556,17 @@ with tab_sh:
                 }
             }
             
-            # Save both files
-            shouts_fp.write_text(json.dumps(new_shouts_config, indent=2, ensure_ascii=False), encoding="utf-8")
+            # Encode both files before writing either, so a bad value leaves neither half-saved
+            pending = [
+                (shouts_fp, jsonio.dumps(new_shouts_config)),
+                (shout_rules_fp, jsonio.dumps({**shout_rules, "suppression_rules": new_suppression_rules})),
+            ]
+            changed = [_write_if_changed(fp, data) for fp, data in pending]
             
-            current_shout_rules = shout_rules.copy()
-            current_shout_rules["suppression_rules"] = new_suppression_rules
-            shout_rules_fp.write_text(json.dumps(current_shout_rules, indent=2, ensure_ascii=False), encoding="utf-8")
-            
-            st.success("Shout configuration saved!")
-            st.rerun()
+            if any(changed):
+                st.success("Shout configuration saved!")
+                st.rerun()
+            st.info("No changes to save")
         except Exception as e:
             st.error(f"Failed to save shout configuration: {e}")
 
@@ -416,23 +574,20 @@ with tab_cfg:
     st.markdown("#### Engine Scoring & Detection")
     st.caption("Tune favourite detection and the tiered advantage model. Changes save to engine_config.json.")
     cfg_fp = norm_dir / "engine_config.json"
-    try:
-        cfg = json.loads(cfg_fp.read_text(encoding="utf-8")) if cfg_fp.exists() else {}
-    except Exception:
-        cfg = {}
+    cfg = _load_json_or(dict, cfg_fp)
     fav_cfg = cfg.get("favourite_detection", {})
     adv_cfg = cfg.get("advantage_model", {})
     ml_cfg = cfg.get("ml_assist", {})
 
-    # Small model status badge
+    # Model presence is checked once here; the badge and the validation expander both reuse it
+    mod_dir = Path(ml_cfg.get("model_dir", "data/ml"))
     try:
-        _mod_dir = Path(ml_cfg.get("model_dir", "data/ml"))
-        _g_ok = (_mod_dir / "gesture.joblib").exists()
-        _s_ok = (_mod_dir / "shout.joblib").exists()
-        badge = f"Models: gesture {'✅' if _g_ok else '❌'}, shout {'✅' if _s_ok else '❌'} (dir: {_mod_dir})"
-        st.caption(badge)
+        g_ok, s_ok = _model_status(str(mod_dir))
     except Exception:
-        pass
+        g_ok, s_ok = False, False
+
+    # Small model status badge
+    st.caption(f"Models: gesture {'✅' if g_ok else '❌'}, shout {'✅' if s_ok else '❌'} (dir: {mod_dir})")
 
     edit_cfg = st.checkbox("Enable editing (advanced)", value=False, key="edit_cfg")
     col_a, col_b = st.columns(2)
@@ -553,28 +708,26 @@ with tab_cfg:
                     },
                 }
             }
-            cfg_fp.write_text(json.dumps(cfg_new, indent=2, ensure_ascii=False), encoding="utf-8")
-            st.success("Engine config saved")
-            st.rerun()
+            if _write_if_changed(cfg_fp, jsonio.dumps(cfg_new)):
+                st.success("Engine config saved")
+                st.rerun()
+            st.info("No changes to save")
         except Exception as e:
             st.error(f"Failed to save engine config: {e}")
 
     st.markdown("---")
     with st.expander("🤖 ML Model Status & Quick Validation", expanded=False):
-        mod_dir = Path(ml_cfg.get("model_dir", "data/ml"))
-        g_ok = (mod_dir / "gesture.joblib").exists()
-        s_ok = (mod_dir / "shout.joblib").exists()
         st.write({"gesture_model": g_ok, "shout_model": s_ok, "dir": str(mod_dir)})
 
         pc1, pc2, pc3 = st.columns(3)
         with pc1:
             vv = st.selectbox("Venue", ["Home","Away"], index=0, key="mlv")
-            stg = st.selectbox("Stage", [s.value for s in MatchStage], index=0, key="mls")
+            stg = st.selectbox("Stage", _MATCH_STAGES, index=0, key="mls")
         with pc2:
             fav_auto = st.checkbox("Auto fav", value=True, key="mlauto")
-            fav_sel = st.selectbox("If manual: status", [f.value for f in FavStatus], index=0, disabled=fav_auto, key="mlfav")
+            fav_sel = st.selectbox("If manual: status", _FAV_STATUSES, index=0, disabled=fav_auto, key="mlfav")
         with pc3:
-            sc = st.selectbox("Score", [s.value for s in ScoreState], index=1, key="mlsc")
+            sc = st.selectbox("Score", _SCORE_STATES, index=1, key="mlsc")
         tpos, opos = st.columns(2)
         with tpos:
             tp = st.number_input("Your pos", 1, 24, 7, key="mltp")
@@ -596,44 +749,48 @@ with tab_cfg:
                 team_form=tform, opponent_form=oform,
                 auto_fav_status=bool(fav_auto),
             )
+            # Positions/form parsed once and shared by both detectors and recommend
+            ctx_feats = derive_context_features(ctx)
             if fav_auto:
                 try:
-                    fav, fav_expl = detect_fav_status(ctx)
+                    fav, fav_expl = detect_fav_status(ctx, ctx_feats)
                     ctx.fav_status = fav
                     st.caption(f"Auto fav: {fav.value} — {fav_expl}")
                 except Exception as e:
                     st.warning(f"Fav detect failed: {e}")
             try:
-                tier, edge, _ = detect_matchup_tier(ctx)
+                tier, edge, _ = detect_matchup_tier(ctx, ctx_feats)
             except Exception:
                 tier, edge = None, None
-            rec = recommend(ctx)
+            rec = recommend(ctx, ctx_feats)
             st.write({
-                "rules": {"gesture": rec.gesture, "shout": getattr(rec.shout, 'value', str(rec.shout))},
+                "rules": {"gesture": rec.gesture, "shout": rec.shout.value},
                 "tier": getattr(tier, 'value', None),
                 "edge": edge,
             })
             # ML probs (if models exist)
             feats = extract_features(ctx, getattr(tier, 'value', None), edge)
-            vec = to_vector_row(feats)
-            gmod = load_model(mod_dir, "gesture")
-            smod = load_model(mod_dir, "shout")
-            gprobs = predict_proba(gmod, vec) if gmod else None
-            sprobs = predict_proba(smod, vec) if smod else None
+            # g_ok/s_ok come from the cached status check above; skip absent models without touching disk
+            probs = _models_proba(mod_dir, tuple(n for n, ok in (("gesture", g_ok), ("shout", s_ok)) if ok), feats)
+            gprobs = probs.get("gesture")
+            sprobs = probs.get("shout")
             st.json({"gesture_proba": gprobs or {}, "shout_proba": sprobs or {}})
     st.markdown("##### Preview detection (uses saved config)")
-    colp, colq, colr = st.columns(3)
-    with colp:
-        venue = st.selectbox("Venue", ["Home","Away"], index=0)
-        team_pos = st.number_input("Your position", 1, 24, 6)
-        opp_pos = st.number_input("Opp position", 1, 24, 12)
-    with colq:
-        team_form = st.text_input("Your form (5 chars W/D/L)", value="WWDLW")
-        opp_form = st.text_input("Opp form (5 chars W/D/L)", value="LDLLD")
-    with colr:
-        xg_for = st.number_input("xG For", 0.0, 10.0, 0.0, 0.05)
-        xg_against = st.number_input("xG Against", 0.0, 10.0, 0.0, 0.05)
-        possession = st.number_input("Possession %", 0, 100, 50)
+    # One rerun per submit instead of one per keystroke across the eight inputs
+    with st.form("detection_preview_form"):
+        colp, colq, colr = st.columns(3)
+        with colp:
+            venue = st.selectbox("Venue", ["Home","Away"], index=0)
+            team_pos = st.number_input("Your position", 1, 24, 6)
+            opp_pos = st.number_input("Opp position", 1, 24, 12)
+        with colq:
+            team_form = st.text_input("Your form (5 chars W/D/L)", value="WWDLW")
+            opp_form = st.text_input("Opp form (5 chars W/D/L)", value="LDLLD")
+        with colr:
+            xg_for = st.number_input("xG For", 0.0, 10.0, 0.0, 0.05)
+            xg_against = st.number_input("xG Against", 0.0, 10.0, 0.0, 0.05)
+            possession = st.number_input("Possession %", 0, 100, 50)
+        st.form_submit_button("Update preview")
 
     sample_ctx = Context(
         stage=MatchStage.PRE_MATCH,
@@ -660,31 +817,34 @@ with tab_cfg:
 
     st.markdown("---")
     with st.expander("🔎 Rule hit preview (sample context)", expanded=False):
-        pc1, pc2, pc3, pc4 = st.columns(4)
-        with pc1:
-            p_stage = st.selectbox("Stage", [s.value for s in MatchStage if s in (MatchStage.PRE_MATCH, MatchStage.EARLY, MatchStage.MID, MatchStage.LATE, MatchStage.VERY_LATE, MatchStage.HALF_TIME, MatchStage.FULL_TIME)], index=0)
-        with pc2:
-            p_venue = st.selectbox("Venue", ["Home","Away"], index=0, key="prev_venue")
-        with pc3:
-            p_auto = st.checkbox("Auto-detect favourite", value=True, key="prev_auto")
-        with pc4:
-            p_fav = st.selectbox("Status", ["Favourite","Underdog"], index=0, disabled=p_auto, key="prev_fav")
-
-        sc1, sc2, sc3 = st.columns(3)
-        with sc1:
-            p_score = st.selectbox("Score state", ["Drawing","Winning","Losing"], index=0)
-        with sc2:
-            p_team_pos = st.number_input("Your pos", 1, 24, 7, key="prev_tpos")
-        with sc3:
-            p_opp_pos = st.number_input("Opp pos", 1, 24, 5, key="prev_opos")
-
-        sf1, sf2 = st.columns(2)
-        with sf1:
-            p_team_form = st.text_input("Your form", value="WWDLW", key="prev_tform")
-        with sf2:
-            p_opp_form = st.text_input("Opp form", value="LDLLD", key="prev_oform")
-
-        if st.button("Run preview", key="run_rule_preview"):
+        with st.form("rule_preview_form"):
+            pc1, pc2, pc3, pc4 = st.columns(4)
+            with pc1:
+                p_stage = st.selectbox("Stage", _REGULAR_STAGES, index=0)
+            with pc2:
+                p_venue = st.selectbox("Venue", ["Home","Away"], index=0, key="prev_venue")
+            with pc3:
+                p_auto = st.checkbox("Auto-detect favourite", value=True, key="prev_auto")
+            with pc4:
+                # Not disabled by p_auto: inside a form that would only update on submit
+                p_fav = st.selectbox("Status", ["Favourite","Underdog"], index=0, key="prev_fav", help="Ignored when auto-detect is on")
+
+            sc1, sc2, sc3 = st.columns(3)
+            with sc1:
+                p_score = st.selectbox("Score state", ["Drawing","Winning","Losing"], index=0)
+            with sc2:
+                p_team_pos = st.number_input("Your pos", 1, 24, 7, key="prev_tpos")
+            with sc3:
+                p_opp_pos = st.number_input("Opp pos", 1, 24, 5, key="prev_opos")
+
+            sf1, sf2 = st.columns(2)
+            with sf1:
+                p_team_form = st.text_input("Your form", value="WWDLW", key="prev_tform")
+            with sf2:
+                p_opp_form = st.text_input("Opp form", value="LDLLD", key="prev_oform")
+            run_preview = st.form_submit_button("Run preview")
+
+        if run_preview:
             ctx = Context(
                 stage=MatchStage(p_stage),
                 fav_status=FavStatus.FAVOURITE if p_fav == "Favourite" else FavStatus.UNDERDOG,
@@ -694,14 +854,27 @@ with tab_cfg:
                 team_form=p_team_form, opponent_form=p_opp_form,
                 auto_fav_status=bool(p_auto),
             )
+            ctx_feats = derive_context_features(ctx)
             try:
                 if p_auto:
-                    fav, fav_expl = detect_fav_status(ctx)
+                    fav, fav_expl = detect_fav_status(ctx, ctx_feats)
                     ctx.fav_status = fav
                     st.info(f"Auto status: {fav.value} — {fav_expl}")
-                tier, edge, tex = detect_matchup_tier(ctx)
+                tier, edge, tex = detect_matchup_tier(ctx, ctx_feats)
                 st.caption(f"Tier: {tier.value} • Edge: {edge:.2f}")
-                rec = recommend(ctx)
+                # A repeat click with the same inputs, rule files, ML toggle and model files reuses the
+                # last result; with feature logging on, recommend() always runs so every click is logged
+                ml_key = (
+                    bool(ml_cfg.get("inference_enabled", False)),
+                    tuple(file_version(mod_dir / f"{name}.joblib") for name in ("gesture", "shout")),
+                )
+                digest = hashlib.blake2b(repr((astuple(ctx), _rules_version(), ml_key)).encode(), digest_size=8).digest()
+                last = st.session_state.get("_rule_preview_last")
+                if last is not None and last[0] == digest and not bool(ml_cfg.get("log_features", False)):
+                    rec = last[1]
+                else:
+                    rec = recommend(ctx, ctx_feats)
+                    st.session_state["_rule_preview_last"] = (digest, rec)
                 if rec is None:
                     st.warning("No base rule matched.")
                 else:
@@ -709,7 +882,7 @@ with tab_cfg:
                     st.write({
                         "mentality": rec.mentality.value,
                         "gesture": rec.gesture,
-                        "shout": rec.shout.value if hasattr(rec.shout, 'value') else str(rec.shout),
+                        "shout": rec.shout.value,
                         "team_talk": rec.team_talk,
                     })
                     if getattr(rec, "trace", None):
@@ -724,14 +897,17 @@ with col1:
     with st.expander("📥 Import JSON Files", expanded=False):
         st.info("🔄 **Instructions:** Upload JSON files to replace the current data. Make sure the JSON structure matches the exported format.")
         
+        # No st.rerun() after an import: _atomic_write drops the file's session copy and changes its
+        # file version, so the tabs above pick up the new data on the next interaction
+        
         # Import Gestures/Catalogs
         uploaded_catalogs = st.file_uploader("Import Gestures & Tones (catalogs.json)", type="json", key="import_catalogs")
         if uploaded_catalogs and st.button("Import Gestures", key="btn_import_catalogs"):
             try:
-                imported_data = json.loads(uploaded_catalogs.read().decode('utf-8'))
-                catalogs_fp.write_text(json.dumps(imported_data, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("Gestures & Tones imported successfully!")
-                st.rerun()
+                raw = uploaded_catalogs.read()
+                jsonio.loads(raw)  # validate only; the uploaded bytes are stored as-is
+                _atomic_write(catalogs_fp, raw)
+                st.toast("Gestures & Tones imported successfully!")
             except Exception as e:
                 st.error(f"Failed to import gestures: {e}")
         
@@ -739,10 +915,10 @@ with col1:
         uploaded_statements = st.file_uploader("Import Statements (statements.json)", type="json", key="import_statements")
         if uploaded_statements and st.button("Import Statements", key="btn_import_statements"):
             try:
-                imported_data = json.loads(uploaded_statements.read().decode('utf-8'))
-                statements_fp.write_text(json.dumps(imported_data, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("Statements imported successfully!")
-                st.rerun()
+                raw = uploaded_statements.read()
+                jsonio.loads(raw)  # validate only; the uploaded bytes are stored as-is
+                _atomic_write(statements_fp, raw)
+                st.toast("Statements imported successfully!")
             except Exception as e:
                 st.error(f"Failed to import statements: {e}")
         
@@ -750,10 +926,10 @@ with col1:
         uploaded_links = st.file_uploader("Import Gesture-Statement Links (gesture_statements.json)", type="json", key="import_links")
         if uploaded_links and st.button("Import Links", key="btn_import_links"):
             try:
-                imported_data = json.loads(uploaded_links.read().decode('utf-8'))
-                gesture_statements_fp.write_text(json.dumps(imported_data, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("Gesture-Statement Links imported successfully!")
-                st.rerun()
+                raw = uploaded_links.read()
+                jsonio.loads(raw)  # validate only; the uploaded bytes are stored as-is
+                _atomic_write(gesture_statements_fp, raw)
+                st.toast("Gesture-Statement Links imported successfully!")
             except Exception as e:
                 st.error(f"Failed to import links: {e}")
         
@@ -761,10 +937,10 @@ with col1:
         uploaded_shouts = st.file_uploader("Import Shouts Config (shouts.json)", type="json", key="import_shouts")
         if uploaded_shouts and st.button("Import Shouts", key="btn_import_shouts"):
             try:
-                imported_data = json.loads(uploaded_shouts.read().decode('utf-8'))
-                shouts_fp.write_text(json.dumps(imported_data, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("Shouts configuration imported successfully!")
-                st.rerun()
+                raw = uploaded_shouts.read()
+                jsonio.loads(raw)  # validate only; the uploaded bytes are stored as-is
+                _atomic_write(shouts_fp, raw)
+                st.toast("Shouts configuration imported successfully!")
             except Exception as e:
                 st.error(f"Failed to import shouts: {e}")
         
@@ -772,10 +948,10 @@ with col1:
         uploaded_shout_rules = st.file_uploader("Import Shout Rules (shout_rules.json)", type="json", key="import_shout_rules")
         if uploaded_shout_rules and st.button("Import Shout Rules", key="btn_import_shout_rules"):
             try:
-                imported_data = json.loads(uploaded_shout_rules.read().decode('utf-8'))
-                shout_rules_fp.write_text(json.dumps(imported_data, indent=2, ensure_ascii=False), encoding="utf-8")
-                st.success("Shout rules imported successfully!")
-                st.rerun()
+                raw = uploaded_shout_rules.read()
+                jsonio.loads(raw)  # validate only; the uploaded bytes are stored as-is
+                _atomic_write(shout_rules_fp, raw)
+                st.toast("Shout rules imported successfully!")
             except Exception as e:
                 st.error(f"Failed to import shout rules: {e}")
 
@@ -786,7 +962,7 @@ with col2:
         try:
             st.download_button(
                 "📋 Download Gestures & Tones (catalogs.json)", 
-                data=catalogs_fp.read_text(encoding="utf-8"), 
+                data=_pretty(_serialized.get(catalogs_fp) or catalogs_fp.read_bytes()), 
                 file_name="catalogs.json", 
                 mime="application/json",
                 help="Contains all tones and their associated gestures"
@@ -797,7 +973,7 @@ with col2:
         try:
             st.download_button(
                 "💬 Download Statements (statements.json)", 
-                data=statements_fp.read_text(encoding="utf-8"), 
+                data=_pretty(_serialized.get(statements_fp) or statements_fp.read_bytes()), 
                 file_name="statements.json", 
                 mime="application/json",
                 help="Contains all statements organized by match stage, score state, and tone"
@@ -808,7 +984,7 @@ with col2:
         try:
             st.download_button(
                 "🔗 Download Links (gesture_statements.json)", 
-                data=gesture_statements_fp.read_text(encoding="utf-8"), 
+                data=_pretty(_serialized.get(gesture_statements_fp) or gesture_statements_fp.read_bytes()), 
                 file_name="gesture_statements.json", 
                 mime="application/json",
                 help="Contains which statements are available for each gesture"
@@ -819,7 +995,7 @@ with col2:
         try:
             st.download_button(
                 "🎮 Download Shouts (shouts.json)", 
-                data=shouts_fp.read_text(encoding="utf-8"), 
+                data=_pretty(_serialized.get(shouts_fp) or shouts_fp.read_bytes()), 
                 file_name="shouts.json", 
                 mime="application/json",
                 help="Contains shout contexts, cooldowns and tone mapping"
@@ -830,7 +1006,7 @@ with col2:
         try:
             st.download_button(
                 "⚙️ Download Shout Rules (shout_rules.json)", 
-                data=shout_rules_fp.read_text(encoding="utf-8"), 
+                data=_pretty(_serialized.get(shout_rules_fp) or shout_rules_fp.read_bytes()), 
                 file_name="shout_rules.json", 
                 mime="application/json",
                 help="Contains shout selection and suppression rules"
@@ -839,23 +1015,25 @@ with col2:
             st.info("No shout_rules.json yet - configure shout rules first")
 
 # JSON Preview Section
-with st.expander("👀 Preview Current JSON Structure", expanded=False):
-    st.info("🔍 **Preview:** See the current JSON structure of your data before exporting.")
-    
-    preview_tab1, preview_tab2, preview_tab3, preview_tab4, preview_tab5 = st.tabs(["Gestures/Tones", "Statements", "Links", "Shouts", "Shout Rules"])
-    
-    with preview_tab1:
-        st.json(catalogs, expanded=False)
-    
-    with preview_tab2:
-        st.json(statements, expanded=False)
-    
-    with preview_tab3:
-        st.json(gesture_statements, expanded=False)
-    
-    with preview_tab4:
-        st.json(shouts_config, expanded=False)
+show_preview = st.checkbox("Show JSON preview", value=False, key="show_preview")
+if show_preview:
+    with st.expander("👀 Preview Current JSON Structure", expanded=True):
+        st.info("🔍 **Preview:** See the current JSON structure of your data before exporting.")
     
-    with preview_tab5:
-        st.json(shout_rules, expanded=False)
+        # Only the selected file is rendered; st.tabs would build all five st.json payloads every rerun
+        previews = {
+            "Gestures/Tones": (catalogs_fp, catalogs),
+            "Statements": (statements_fp, statements),
+            "Links": (gesture_statements_fp, gesture_statements),
+            "Shouts": (shouts_fp, shouts_config),
+            "Shout Rules": (shout_rules_fp, shout_rules),
+        }
+        choice = st.radio("Preview file", list(previews), horizontal=True, key="preview_choice", label_visibility="collapsed")
+        fp, obj = previews[choice]
+        raw = _serialized.get(fp)
+        if fp == statements_fp and st.session_state.get("_staged_statements"):
+            # Staged sections are not on disk yet, so the stored bytes would be stale
+            raw = None
+        # st.json takes a JSON string as-is; hand it bytes we already have instead of the dict
+        st.json((raw if raw is not None else jsonio.dumps(obj)).decode("utf-8"), expanded=False)
     
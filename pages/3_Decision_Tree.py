@@ -1,5 +1,6 @@
-import json
+from itertools import chain
 from pathlib import Path
+from typing import Optional
 import streamlit as st
 import html
 from domain.models import (
@@ -13,7 +14,13 @@ from domain.models import (
     TalkAudience,
     Shout,
 )
-from domain.rules_engine import recommend, detect_fav_status, detect_matchup_tier
+from domain.rules_engine import recommend, detect_fav_status, detect_matchup_tier, derive_context_features
+from services import jsonio
+from services.fileio import file_version
+
+# Static simulator options, kept at page level so simulator fragment reruns reuse them
+_SPEC_OPTS = tuple(s.value for s in SpecialSituation if s != SpecialSituation.NONE)
+_REACT_OPTS = tuple(r.value for r in PlayerReaction)
 
 st.set_page_config(page_title="Rules Decision Tree", page_icon="🌳", layout="wide")
 st.title("🌳 Rules Decision Tree")
@@ -38,15 +45,23 @@ special_fp = Path(__file__).resolve().parent.parent / "data" / "rules" / "normal
 reactions_fp = Path(__file__).resolve().parent.parent / "data" / "rules" / "normalized" / "reaction_rules.json"
 
 @st.cache_data(show_spinner=False)
-def load_json(fp: Path):
+def _load_json_cached(fp: Path, version: tuple):
+    # version is only part of the cache key, so edited rule files are picked up
+    return jsonio.loads(fp.read_bytes())
+
+def load_json(fp: Path, version: Optional[tuple] = None):
     try:
-        if fp.exists():
-            return json.loads(fp.read_text(encoding="utf-8"))
+        if version is None:
+            version = file_version(fp)
+        if version is not None:
+            return _load_json_cached(fp, version)
     except Exception:
         pass
     return []
 
-base_rules = load_json(base_fp)
+# One stat for the base rules, shared by the load and the filter cache key so both see the same version
+_base_version = file_version(base_fp)
+base_rules = load_json(base_fp, _base_version)
 specials = load_json(special_fp)
 reactions = load_json(reactions_fp)
 
@@ -66,28 +81,61 @@ text_query = st.sidebar.text_input("Search (gesture / talk / shout)")
 show_specials = st.sidebar.checkbox("Show Specials", value=True)
 show_reactions = st.sidebar.checkbox("Show Reactions", value=True)
 
-def rule_matches(r: dict) -> bool:
+def _rule_blob(r: dict) -> str:
     w = r.get("when", {})
     rec = r.get("recommendation", {})
-    if sel_stage and w.get("stage") not in sel_stage:
+    return " ".join([
+        str(w.get("stage","")), str(w.get("venue","")), str(w.get("favStatus","")), str(w.get("scoreState","")),
+        str(rec.get("gesture","")), str(rec.get("teamTalk","")), str(rec.get("shout",""))
+    ]).lower()
+
+@st.cache_data(show_spinner=False)
+def _rule_rows(version: Optional[tuple]) -> list[tuple]:
+    """Flat (venue, favStatus, scoreState, search text) row per base rule, built once per file version."""
+    rows = []
+    for r in load_json(base_fp, version):
+        w = r.get("when", {})
+        rows.append((w.get("venue"), w.get("favStatus"), w.get("scoreState"), _rule_blob(r)))
+    return rows
+
+@st.cache_data(show_spinner=False)
+def _stage_index(version: Optional[tuple]) -> dict[str, list[int]]:
+    # Stage is the main discriminator, so bucket rule positions by it once per file version
+    index: dict[str, list[int]] = {}
+    for i, r in enumerate(load_json(base_fp, version)):
+        index.setdefault(r.get("when", {}).get("stage"), []).append(i)
+    return index
+
+def rule_matches(row: tuple, venue_t: tuple, fav_t: tuple, score_t: tuple, q_tokens: tuple) -> bool:
+    venue, fav, score, blob = row
+    # A rule without a venue/status/score condition applies to every selection
+    if venue_t and venue and venue not in venue_t:
         return False
-    if sel_venue and w.get("venue") and w.get("venue") not in sel_venue:
+    if fav_t and fav and fav not in fav_t:
         return False
-    if sel_fav and w.get("favStatus") and w.get("favStatus") not in sel_fav:
+    if score_t and score and score not in score_t:
         return False
-    if sel_score and w.get("scoreState") and w.get("scoreState") not in sel_score:
+    # Every whitespace-separated token must appear, in any order
+    if q_tokens and not all(tok in blob for tok in q_tokens):
         return False
-    if text_query:
-        q = text_query.lower()
-        blob = " ".join([
-            str(w.get("stage","")), str(w.get("venue","")), str(w.get("favStatus","")), str(w.get("scoreState","")),
-            str(rec.get("gesture","")), str(rec.get("teamTalk","")), str(rec.get("shout",""))
-        ]).lower()
-        if q not in blob:
-            return False
     return True
 
-filtered = [r for r in base_rules if rule_matches(r)]
+@st.cache_data(show_spinner=False)
+def _filtered_indices(version: Optional[tuple], stage_t: tuple, venue_t: tuple, fav_t: tuple, score_t: tuple, q_tokens: tuple) -> list[int]:
+    """Positions in base_rules passing the sidebar filters, cached per filter state."""
+    rows = _rule_rows(version)
+    if stage_t:
+        index = _stage_index(version)
+        # Sorted so the graph and cards keep file order across stages
+        candidates = sorted(chain.from_iterable(index.get(s, ()) for s in set(stage_t)))
+    else:
+        candidates = range(len(rows))
+    return [i for i in candidates if rule_matches(rows[i], venue_t, fav_t, score_t, q_tokens)]
+
+filter_key = (tuple(sel_stage), tuple(sel_venue), tuple(sel_fav), tuple(sel_score), tuple(text_query.lower().split()))
+# Indices rather than rule dicts, so a cache hit doesn't copy the matched rules
+filtered_idx = _filtered_indices(_base_version, *filter_key)
+filtered = [base_rules[i] for i in filtered_idx]
 
 # ---------------- Graphviz builder ----------------
 stage_color = {
@@ -136,7 +184,7 @@ def rule_label(r: dict) -> str:
     body = f"{gesture} | {shout}"
     return f"{{ {{ {head} }} | {{ {body} }} | {{ {talk} }} }}"
 
-def build_dot(rules: list[dict]) -> str:
+def build_dot(rules: list[dict], show_specials: bool, show_reactions: bool) -> str:
     lines = [
         "digraph G {",
         "  rankdir=LR;",
@@ -153,27 +201,28 @@ def build_dot(rules: list[dict]) -> str:
 
     for s, items in by_stage.items():
         color = stage_color.get(s, "#334155")
+        esc_s = dot_escape(s)
         # Important: quote hex color, otherwise '#' is parsed as a comment in DOT
-        lines.append(f"  subgraph cluster_{dot_escape(s)} {{ label=\"{dot_escape(s)}\"; color=\"{color}\"; style=dashed;")
-        for node_id, r in items:
-            label = rule_label(r)
-            fill = color
-            # Use a proper record label (quoted string), not an HTML-like label
-            lines.append(f"    {node_id} [label=\"{label}\", fillcolor=\"{fill}\", tooltip=\"{dot_escape(s)}\"];")
+        lines.append(f"  subgraph cluster_{esc_s} {{ label=\"{esc_s}\"; color=\"{color}\"; style=dashed;")
+        # Use a proper record label (quoted string), not an HTML-like label
+        tail = f"\", fillcolor=\"{color}\", tooltip=\"{esc_s}\"];"
+        lines.extend(f"    {node_id} [label=\"{rule_label(r)}{tail}" for node_id, r in items)
         lines.append("  }")
 
     if show_specials and specials:
         lines.append("  subgraph cluster_specials { label=\"Special Overrides\"; style=dashed; color=\"#64748b\"; ")
-        for i, s in enumerate(specials[:10]):
-            tag = s.get("tag","?")
-            lines.append(f"    spec{i} [label=\"{dot_escape(tag)}\", shape=box, fillcolor=\"#0f172a\"];")
+        lines.extend(
+            f"    spec{i} [label=\"{dot_escape(s.get('tag','?'))}\", shape=box, fillcolor=\"#0f172a\"];"
+            for i, s in enumerate(specials[:10])
+        )
         lines.append("  }")
 
     if show_reactions and reactions:
         lines.append("  subgraph cluster_react { label=\"Reaction Adjustments\"; style=dashed; color=\"#64748b\"; ")
-        for i, r in enumerate(reactions[:10]):
-            re = r.get("reaction","?")
-            lines.append(f"    react{i} [label=\"{dot_escape(re)}\", shape=box, fillcolor=\"#0f172a\"];")
+        lines.extend(
+            f"    react{i} [label=\"{dot_escape(r.get('reaction','?'))}\", shape=box, fillcolor=\"#0f172a\"];"
+            for i, r in enumerate(reactions[:10])
+        )
         lines.append("  }")
 
     # Soft links (for context)
@@ -186,11 +235,28 @@ def build_dot(rules: list[dict]) -> str:
     lines.append("}")
     return "\n".join(lines)
 
+@st.cache_data(show_spinner=False)
+def _cached_dot(base_version: Optional[tuple], special_version: Optional[tuple], reactions_version: Optional[tuple], filter_key: tuple, show_specials: bool, show_reactions: bool, max_nodes: int) -> str:
+    """DOT source per file versions + filter state; unchanged filters skip the string build."""
+    rules = load_json(base_fp, base_version)
+    # Graphviz layout cost grows with node count, so only the first max_nodes matches are drawn
+    idx = _filtered_indices(base_version, *filter_key)[:max_nodes]
+    return build_dot([rules[i] for i in idx], show_specials, show_reactions)
+
+@st.cache_data(show_spinner=False)
+def _rule_json(base_version: Optional[tuple], idx: int) -> str:
+    """Indented JSON of one base rule for the Cards view, built once per file version."""
+    r = load_json(base_fp, base_version)[idx]
+    return jsonio.dumps(r, indent=True).decode("utf-8")
+
 # ---------------- View switcher ----------------
 view = st.radio("View", ["Graph", "Cards", "Simulator"], horizontal=True)
 
 if view == "Graph":
-    dot = build_dot(filtered)
+    max_nodes = st.sidebar.slider("Max graph nodes", 50, 1000, 150, step=50)
+    if len(filtered) > max_nodes:
+        st.warning(f"Showing {max_nodes} of {len(filtered)} rules — narrow the filters or raise the limit to see more.")
+    dot = _cached_dot(_base_version, file_version(special_fp), file_version(reactions_fp), filter_key, show_specials, show_reactions, max_nodes)
     col_g, col_l = st.columns([3,1])
     with col_g:
         st.graphviz_chart(dot, use_container_width=True)
@@ -204,30 +270,36 @@ if view == "Graph":
 elif view == "Cards":
     # Cards view: scrollable, searchable
     st.write(f"Filtered rules: {len(filtered)} / Total: {len(base_rules)}")
-    for r in filtered:
+    for i, r in zip(filtered_idx, filtered):
         w = r.get("when", {})
         rec = r.get("recommendation", {})
+        talk = rec.get("teamTalk") or "(auto)"
         with st.container():
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
+            # One markdown element per card: each st.markdown is its own delta to the browser,
+            # and a lone opening <div> never wrapped the following elements anyway
             st.markdown(
+                f"<div class='card'>"
                 f"<div class='row'><span class='chip badge'>{html.escape(w.get('stage','?'))}</span>"
                 f"<span class='chip'>{html.escape(w.get('favStatus','*'))}</span>"
                 f"<span class='chip'>{html.escape(w.get('venue','*'))}</span>"
-                f"<span class='chip'>{html.escape(w.get('scoreState','*'))}</span></div>",
-                unsafe_allow_html=True,
-            )
-            st.markdown(
+                f"<span class='chip'>{html.escape(w.get('scoreState','*'))}</span></div>"
                 f"<div class='row'><span class='chip'>Gesture: {html.escape(rec.get('gesture','—'))}</span>"
-                f"<span class='chip'>Shout: {html.escape(rec.get('shout','None'))}</span></div>",
+                f"<span class='chip'>Shout: {html.escape(rec.get('shout','None'))}</span></div>"
+                f"<div class='muted'>Talk: {html.escape(talk)}</div>"
+                f"</div>",
                 unsafe_allow_html=True,
             )
-            talk = rec.get("teamTalk") or "(auto)"
-            st.markdown(f"<div class='muted'>Talk: {html.escape(talk)}</div>", unsafe_allow_html=True)
+            # Expander bodies are sent even while collapsed: a pre-rendered code block is far
+            # lighter than st.json's interactive tree for every card
             with st.expander("Raw JSON"):
-                st.json(r)
-            st.markdown("</div>", unsafe_allow_html=True)
+                st.code(_rule_json(_base_version, i), language="json")
 
-if view == "Simulator":
+# Scoped reruns where available (st.fragment landed in 1.37; requirements allow older Streamlit)
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+@_fragment
+def render_simulator() -> None:
+    """Simulator form; as a fragment, a submit reruns only this block, not the filter/graph/cards above."""
     st.subheader("Scenario Simulator")
     st.caption("Build any context (stage, venue, score, stats, specials) and preview the live recommendation.")
 
@@ -239,9 +311,7 @@ if view == "Simulator":
         with st.form("sim_form"):
             c1, c2, c3 = st.columns(3)
             with c1:
-                stage = st.selectbox("Stage", [s for s in [
-                    "PreMatch","Early","Mid","Late","VeryLate","HalfTime","FullTime"
-                ]], index=0)
+                stage = st.selectbox("Stage", stages, index=0)
             with c2:
                 venue = st.selectbox("Venue", ["Home","Away"], index=0)
             with c3:
@@ -297,11 +367,9 @@ if view == "Simulator":
             st.markdown("---")
             sp1, sp2 = st.columns(2)
             with sp1:
-                spec_opts = [s.value for s in SpecialSituation if s != SpecialSituation.NONE]
-                specials_sel = st.multiselect("Special situations", spec_opts, default=[])
+                specials_sel = st.multiselect("Special situations", _SPEC_OPTS, default=[])
             with sp2:
-                react_opts = [r.value for r in PlayerReaction]
-                reactions_sel = st.multiselect("Player reactions", react_opts, default=[])
+                reactions_sel = st.multiselect("Player reactions", _REACT_OPTS, default=[])
 
             submitted = st.form_submit_button("Run simulation", type="primary")
 
@@ -331,9 +399,11 @@ if view == "Simulator":
                 auto_fav_status=bool(auto_fav),
                 ht_score_delta=int(ht_delta) if ht_delta is not None else None,
             )
+            # Positions/form parsed once and shared by both detectors and recommend
+            ctx_feats = derive_context_features(ctx)
             if auto_fav:
                 try:
-                    fav_auto, expl = detect_fav_status(ctx)
+                    fav_auto, expl = detect_fav_status(ctx, ctx_feats)
                     ctx.fav_status = fav_auto
                     st.info(f"Auto-detected status: {fav_auto.value} — {expl}")
                 except Exception as e:
@@ -341,7 +411,7 @@ if view == "Simulator":
 
             # Always compute granular tier for transparency
             try:
-                tier, edge, expl2 = detect_matchup_tier(ctx)
+                tier, edge, expl2 = detect_matchup_tier(ctx, ctx_feats)
                 st.caption(f"Tier: {tier.value} • Edge: {edge:.2f}")
                 with st.expander("Tier explanation"):
                     st.write(expl2)
@@ -349,7 +419,7 @@ if view == "Simulator":
                 st.caption(f"Tier calc failed: {e}")
 
             try:
-                rec = recommend(ctx)
+                rec = recommend(ctx, ctx_feats)
             except Exception as e:
                 rec = None
                 st.error(f"Engine error: {e}")
@@ -382,5 +452,8 @@ if view == "Simulator":
                             st.write(f"- {n}")
                 st.markdown("</div>", unsafe_allow_html=True)
 
+if view == "Simulator":
+    render_simulator()
+
 st.markdown("---")
 st.write(f"Filtered rules: {len(filtered)} / Total: {len(base_rules)}")
\ No newline at end of file
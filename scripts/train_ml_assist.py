@@ -1,20 +1,20 @@
 from __future__ import annotations
 
-import csv
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 import argparse
 
 try:
     import numpy as np
+    import pandas as pd
     from sklearn.linear_model import LogisticRegression
     from sklearn.model_selection import train_test_split
     from sklearn.preprocessing import StandardScaler
     from sklearn.pipeline import Pipeline
     import joblib
 except Exception as e:
-    raise SystemExit("Please install scikit-learn, numpy, and joblib to train: pip install scikit-learn numpy joblib")
+    raise SystemExit("Please install scikit-learn, numpy, pandas, and joblib to train: pip install scikit-learn numpy pandas joblib")
 
 
 TARGETS = {
@@ -23,42 +23,38 @@ TARGETS = {
 }
 
 
-def read_features(csv_path: Path) -> List[dict]:
-    rows = []
-    with csv_path.open("r", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            rows.append(row)
-    return rows
-
-
-def vec_feature(row: dict, feature_order: List[str]) -> List[float]:
-    def num(x):
-        try:
-            return float(x)
-        except Exception:
-            return 0.0
-    return [num(row.get(k, 0)) for k in feature_order]
+def read_features(csv_path: Path, target: str, feature_order: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Load (X, y) for rows with the target set; missing or non-numeric feature cells become 0.0."""
+    # Only the feature and target columns are parsed (the log also carries free-text talk etc.);
+    # a callable tolerates feature columns the logger never wrote
+    wanted = set(feature_order) | {target}
+    # Everything as text first: the C parser does the splitting, and "None" stays a real shout label
+    df = pd.read_csv(csv_path, usecols=lambda c: c in wanted, dtype=str, keep_default_na=False)
+    if target not in df.columns:
+        raise SystemExit("No rows with target present; ensure logger collected data and target column exists.")
+    df = df[df[target] != ""]
+    if df.empty:
+        raise SystemExit("No rows with target present; ensure logger collected data and target column exists.")
+    # Columns the logger doesn't write (or categorical text like "Mid") fall back to 0.0, as before
+    feats = df.reindex(columns=feature_order, fill_value="")
+    X = feats.apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=np.float32)
+    y = df[target].to_numpy()
+    return X, y
 
 
-def train_model(rows: List[dict], target: str, feature_order: List[str], out_dir: Path):
-    X = []
-    y = []
-    for row in rows:
-        if not row.get(target):
-            continue
-        X.append(vec_feature(row, feature_order))
-        y.append(row[target])
-    if not X:
-        raise SystemExit("No rows with target present; ensure logger collected data and target column exists.")
-    X = np.array(X, dtype=float)
-    y = np.array(y)
+def train_model(X: np.ndarray, y: np.ndarray, target: str, out_dir: Path):
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     pipe = Pipeline([
-        ("scaler", StandardScaler()),
-        ("clf", LogisticRegression(max_iter=1000, multi_class="auto")),
+        # copy=False: scale the float32 training matrix in place rather than duplicating it
+        ("scaler", StandardScaler(copy=False)),
+        # saga converges quickly on standardized features; multi_class was removed from
+        # newer scikit-learn (multinomial is the default) and n_jobs has no effect for it
+        ("clf", LogisticRegression(solver="saga", max_iter=2000, tol=1e-3)),
     ])
     pipe.fit(X_train, y_train)
+    # The saved model must not scale its input in place: inference scores one feature row
+    # with both the gesture and the shout model
+    pipe.set_params(scaler__copy=True)
     acc = pipe.score(X_test, y_test)
     out_dir.mkdir(parents=True, exist_ok=True)
     joblib.dump(pipe, out_dir / f"{target}.joblib")
@@ -71,10 +67,10 @@ if __name__ == "__main__":
     parser.add_argument("--out", type=str, default="data/ml")
     parser.add_argument("--target", type=str, choices=["gesture", "shout"], default="gesture")
     args = parser.parse_args()
-    rows = read_features(Path(args.csv))
     # Define feature order consistent with domain.ml_assist.FEATURE_COLUMNS
     feature_order = [
         "stage","venue","fav_status","score_state","minute","team_pos","opp_pos","pos_delta",
         "form_team","form_opp","form_delta","xg_for","xg_against","xg_delta","shots_for","shots_against","shots_delta","possession","tier_edge"
     ]
-    train_model(rows, args.target, feature_order, Path(args.out))
+    X, y = read_features(Path(args.csv), args.target, feature_order)
+    train_model(X, y, args.target, Path(args.out))
@@ -0,0 +1,32 @@
+"""
+File write helpers shared by the services layer and the pages.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+def file_version(fp: Path) -> Optional[Tuple[int, int]]:
+    """(st_mtime_ns, st_size) of fp, or None when it is missing.
+
+    Cache keys include this so any rewrite of the file forces a re-read. Size is part of it because
+    on filesystems with coarse mtimes a rewrite within the same tick leaves the mtime unchanged.
+    """
+    try:
+        info = fp.stat()
+    except OSError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+def atomic_write(fp: Path, data: bytes) -> None:
+    """Write via a sibling temp file and rename, so a crash never leaves a half-written file."""
+    tmp = fp.with_suffix(fp.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        # One flush of the data before the rename; without it a crash can leave an empty file renamed into place
+        os.fsync(f.fileno())
+    os.replace(tmp, fp)
@@ -0,0 +1,45 @@
+"""
+JSON encode/decode helpers shared by the services layer and the pages.
+
+Uses orjson when it is installed and falls back to the stdlib json module.
+Both emit UTF-8 without ASCII escaping and parse each other's output, but the
+bytes can differ (e.g. floats: orjson writes 1e16, stdlib 1e+16), so nothing
+that hashes or compares encoded bytes should go through here.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def loads(raw: bytes | str) -> Any:
+    """Parse JSON from bytes (preferred, skips a decode step) or str."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _default(obj: Any) -> Any:
+    # stdlib json accepts float/int subclasses (e.g. numpy scalars); orjson needs them unwrapped
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Encode to UTF-8 bytes; indent=True gives the json.dumps(indent=2) shape."""
+    if orjson is not None:
+        opt = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            opt |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=opt)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
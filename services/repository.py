@@ -5,15 +5,28 @@ Playbook.json has been removed in favor of the JSON-driven Rules Admin system.
 """
 from __future__ import annotations
 
-import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from domain.policies import EnginePolicies
+from services import jsonio
+from services.fileio import atomic_write, file_version
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 
 
+@lru_cache(maxsize=32)
+def _load_json_cached(path_str: str, version: Optional[Tuple[int, int]]) -> Any:
+    # The parsed object is shared, so callers below copy before handing it out
+    return jsonio.loads(Path(path_str).read_bytes())
+
+
+def _load_json(fp: Path) -> Any:
+    # A missing file (version None) raises FileNotFoundError from the read, which lru_cache doesn't keep
+    return _load_json_cached(str(fp), file_version(fp))
+
+
 class Repository:
     def __init__(self, data_dir: Path | None = None) -> None:
         self.data_dir = data_dir or DATA_DIR
@@ -21,14 +34,12 @@ class Repository:
 
     def load_gestures(self) -> Dict[str, List[str]]:
         fp = self.data_dir / "gestures.json"
-        with fp.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return {tone: list(items) for tone, items in _load_json(fp).items()}
 
     def load_presets(self) -> List[Dict[str, Any]]:
         fp = self.data_dir / "presets.json"
         if fp.exists():
-            with fp.open("r", encoding="utf-8") as f:
-                raw = json.load(f)
+            raw = _load_json(fp)
             # Normalize possible legacy/manual shapes
             norm: List[Dict[str, Any]] = []
             if isinstance(raw, list):
@@ -38,7 +49,7 @@ class Repository:
                     name = item.get("name")
                     data = item.get("data") or item.get("context")
                     if name and isinstance(data, dict):
-                        norm.append({"name": name, "data": data})
+                        norm.append({"name": name, "data": dict(data)})
             return norm
         return []
 
@@ -47,33 +58,27 @@ class Repository:
         presets: List[Dict[str, Any]] = []
         if fp.exists():
             try:
-                with fp.open("r", encoding="utf-8") as f:
-                    presets = json.load(f)
+                presets = _load_json(fp)
             except Exception:
                 presets = []
-        # Remove any with same name
-        sanitized: List[Dict[str, Any]] = []
-        for p in presets:
-            if not isinstance(p, dict):
-                continue
-            if "name" not in p:
-                continue
-            if p.get("name") == name:
-                continue  # drop old entry with same name
-            # Keep only fields we understand
-            item = {"name": p.get("name"), "data": p.get("data") or p.get("context")}
-            sanitized.append(item)
-        sanitized.append({"name": name, "data": data})
-        presets = sanitized
-        with fp.open("w", encoding="utf-8") as f:
-            json.dump(presets, f, indent=2, ensure_ascii=False)
+        # Keep only fields we understand, one entry per name (a later duplicate wins)
+        by_name: Dict[str, Dict[str, Any]] = {
+            p["name"]: {"name": p["name"], "data": p.get("data") or p.get("context")}
+            for p in presets
+            if isinstance(p, dict) and "name" in p
+        }
+        # Re-inserting moves the upserted preset to the end, as the list rebuild used to
+        by_name.pop(name, None)
+        by_name[name] = {"name": name, "data": data}
+        presets = list(by_name.values())
+        atomic_write(fp, jsonio.dumps(presets, indent=True))
 
     def load_policies(self) -> EnginePolicies:
         fp = self.data_dir / "policies.json"
         if not fp.exists():
             return EnginePolicies()
         try:
-            raw = json.loads(fp.read_text(encoding="utf-8"))
+            raw = _load_json(fp)
         except Exception:
             return EnginePolicies()
         pol = EnginePolicies()
@@ -89,4 +94,14 @@ class Repository:
         pol.formDiffBucket = int(raw.get("formDiffBucket", pol.formDiffBucket))
         pol.homeAdvantageBonus = int(raw.get("homeAdvantageBonus", pol.homeAdvantageBonus))
         pol.inPlayShoutHeuristic = bool(raw.get("inPlayShoutHeuristic", pol.inPlayShoutHeuristic))
-        return pol
\ No newline at end of file
+        return pol
+
+_REPO: Optional[Repository] = None
+
+
+def get_repo() -> Repository:
+    """Process-wide Repository over DATA_DIR; construct Repository(path) directly for other dirs."""
+    global _REPO
+    if _REPO is None:
+        _REPO = Repository()
+    return _REPO
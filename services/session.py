@@ -1,21 +1,29 @@
 """
 Session management for match lifecycle: start → log events → complete.
 
-Enforces a single active session. Stores active snapshot in JSON and archives
-completed sessions to JSONL for later analysis.
+Enforces a single active session. Stores active snapshot in JSON, appends its
+events to a JSONL sidecar, and archives completed sessions to JSONL for later
+analysis.
 """
 from __future__ import annotations
 
+import copy
 import json
+import mmap
+import os
+import time
 import uuid
 from datetime import datetime, timezone
+from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from domain.models import (
     Context,
     MatchStage, FavStatus, Venue, ScoreState, SpecialSituation, PlayerReaction, TalkAudience,
 )
+from services import jsonio
+from services.fileio import file_version
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "sessions"
 ACTIVE_FILE = DATA_DIR / "active.json"
@@ -26,8 +34,56 @@ def _ensure_dirs() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _events_file() -> Path:
+    # Resolved per call, next to ACTIVE_FILE, so repointing ACTIVE_FILE (as tests do) moves it too
+    return ACTIVE_FILE.with_name("active_events.jsonl")
+
+
+def _read_event_lines() -> List[Tuple[bytes, Dict[str, Any]]]:
+    """(raw line, parsed event) for each intact sidecar line.
+
+    An append cut short (crash, full disk) leaves a torn last line; it is dropped
+    rather than failing every reader, and never copied into the archive.
+    """
+    fp = _events_file()
+    if not fp.exists():
+        return []
+    out: List[Tuple[bytes, Dict[str, Any]]] = []
+    for line in fp.read_bytes().splitlines():
+        if not line.strip():
+            continue
+        try:
+            event = jsonio.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict):
+            out.append((line, event))
+    return out
+
+
+def _read_events() -> List[Dict[str, Any]]:
+    return [event for _, event in _read_event_lines()]
+
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") for the second last formatted
+_iso_second: Tuple[int, str] = (-1, "")
+
+
+def _now_iso() -> str:
+    """Same text as datetime.now(timezone.utc).isoformat(), formatting the date/time part once per second."""
+    global _iso_second
+    sec, usec = divmod(time.time_ns() // 1000, 1_000_000)
+    cached = _iso_second  # one read, so a concurrent update can't mix seconds
+    if cached[0] != sec:
+        cached = _iso_second = (sec, datetime.fromtimestamp(sec, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"))
+    if usec:
+        return f"{cached[1]}.{usec:06d}+00:00"
+    return f"{cached[1]}+00:00"
+
+
 def _enum_val(e):
-    return e.value if hasattr(e, "value") else e
+    # isinstance is a single type check; hasattr on a plain str value raised and swallowed AttributeError
+    return e.value if isinstance(e, Enum) else e
 
 
 def serialize_context(ctx: Context) -> Dict[str, Any]:
@@ -57,43 +113,81 @@ def serialize_context(ctx: Context) -> Dict[str, Any]:
     }
 
 
+# value -> member tables, so deserializing skips the Enum(...) call machinery per field/item
+_STAGE_MAP = {m.value: m for m in MatchStage}
+_FAV_MAP = {m.value: m for m in FavStatus}
+_VENUE_MAP = {m.value: m for m in Venue}
+_SCORE_MAP = {m.value: m for m in ScoreState}
+_SITUATION_MAP = {m.value: m for m in SpecialSituation}
+_REACTION_MAP = {m.value: m for m in PlayerReaction}
+_AUDIENCE_MAP = {m.value: m for m in TalkAudience}
+
+
 def deserialize_context(d: Dict[str, Any]) -> Context:
-    def maybe(v, enum):
-        return enum(v) if v is not None else None
-    return Context(
-        stage=MatchStage(d["stage"]),
-        fav_status=FavStatus(d["fav_status"]),
-        venue=Venue(d["venue"]),
-        score_state=maybe(d.get("score_state"), ScoreState),
-        special_situations=[SpecialSituation(x) for x in d.get("special_situations", [])],
-        player_reactions=[PlayerReaction(x) for x in d.get("player_reactions", [])],
-        minute=d.get("minute"),
-        possession_pct=d.get("possession_pct"),
-        shots_for=d.get("shots_for"),
-        shots_against=d.get("shots_against"),
-        shots_on_target_for=d.get("shots_on_target_for"),
-        shots_on_target_against=d.get("shots_on_target_against"),
-        xg_for=d.get("xg_for"),
-        xg_against=d.get("xg_against"),
-        team_position=d.get("team_position"),
-        opponent_position=d.get("opponent_position"),
-        team_form=d.get("team_form"),
-        opponent_form=d.get("opponent_form"),
-        team_goals=d.get("team_goals"),
-        opponent_goals=d.get("opponent_goals"),
-        auto_fav_status=bool(d.get("auto_fav_status", False)),
-        preferred_talk_audience=maybe(d.get("preferred_talk_audience"), TalkAudience),
-    )
+    try:
+        score_state = d.get("score_state")
+        audience = d.get("preferred_talk_audience")
+        return Context(
+            stage=_STAGE_MAP[d["stage"]],
+            fav_status=_FAV_MAP[d["fav_status"]],
+            venue=_VENUE_MAP[d["venue"]],
+            score_state=_SCORE_MAP[score_state] if score_state is not None else None,
+            special_situations=[_SITUATION_MAP[x] for x in d.get("special_situations", [])],
+            player_reactions=[_REACTION_MAP[x] for x in d.get("player_reactions", [])],
+            minute=d.get("minute"),
+            possession_pct=d.get("possession_pct"),
+            shots_for=d.get("shots_for"),
+            shots_against=d.get("shots_against"),
+            shots_on_target_for=d.get("shots_on_target_for"),
+            shots_on_target_against=d.get("shots_on_target_against"),
+            xg_for=d.get("xg_for"),
+            xg_against=d.get("xg_against"),
+            team_position=d.get("team_position"),
+            opponent_position=d.get("opponent_position"),
+            team_form=d.get("team_form"),
+            opponent_form=d.get("opponent_form"),
+            team_goals=d.get("team_goals"),
+            opponent_goals=d.get("opponent_goals"),
+            auto_fav_status=bool(d.get("auto_fav_status", False)),
+            preferred_talk_audience=_AUDIENCE_MAP[audience] if audience is not None else None,
+        )
+    except KeyError as e:
+        # Keep the ValueError that Enum(...) raised for unknown values; a missing "stage" etc. too
+        raise ValueError(f"Invalid context value: {e.args[0]!r}") from None
 
 
 class SessionManager:
     def __init__(self) -> None:
         _ensure_dirs()
+        # (path, (st_mtime_ns, st_size), parsed active.json) as this instance last wrote or read it
+        self._snapshot: Optional[Tuple[str, Tuple[int, int], Dict[str, Any]]] = None
+
+    def _write_snapshot(self, session: Dict[str, Any]) -> None:
+        ACTIVE_FILE.write_text(json.dumps(session, ensure_ascii=False, indent=2), encoding="utf-8")
+        held = copy.deepcopy(session)
+        self._snapshot = (str(ACTIVE_FILE), file_version(ACTIVE_FILE), held)
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        """active.json as a fresh dict; skips the read/parse when the file is the one held in memory."""
+        # A missing file (version None) never matches, so the read below raises FileNotFoundError
+        version = file_version(ACTIVE_FILE)
+        snap = self._snapshot
+        if snap is None or snap[0] != str(ACTIVE_FILE) or snap[1] != version:
+            snap = (str(ACTIVE_FILE), version, jsonio.loads(ACTIVE_FILE.read_bytes()))
+            self._snapshot = snap
+        # Deep copy: callers extend events and may edit the nested context; the held dict stays as saved
+        session = copy.deepcopy(snap[2])
+        session.setdefault("events", [])
+        return session
 
     def get_active(self) -> Optional[Dict[str, Any]]:
-        if ACTIVE_FILE.exists():
-            return json.loads(ACTIVE_FILE.read_text(encoding="utf-8"))
-        return None
+        try:
+            session = self._read_snapshot()
+        except FileNotFoundError:
+            return None
+        # Events live in the sidecar; any still inside active.json (older sessions) come first
+        session["events"].extend(_read_events())
+        return session
 
     def start(self, context: Context, name: str) -> Dict[str, Any]:
         if ACTIVE_FILE.exists():
@@ -102,22 +196,30 @@ class SessionManager:
             raise ValueError("Session name is required.")
         session = {
             "id": str(uuid.uuid4())[:8],
-            "started_at": datetime.now(timezone.utc).isoformat(),
+            "started_at": _now_iso(),
             "status": "active",
             "name": name.strip(),
             "context": serialize_context(context),
             "events": [],
         }
-        ACTIVE_FILE.write_text(json.dumps(session, ensure_ascii=False, indent=2), encoding="utf-8")
+        self._write_snapshot(session)
+        _events_file().write_bytes(b"")
         return session
 
     def append_event(self, event: Dict[str, Any]) -> None:
         if not ACTIVE_FILE.exists():
             raise RuntimeError("No active session to log event.")
-        session = json.loads(ACTIVE_FILE.read_text(encoding="utf-8"))
-        event["ts"] = datetime.now(timezone.utc).isoformat()
-        session["events"].append(event)
-        ACTIVE_FILE.write_text(json.dumps(session, ensure_ascii=False, indent=2), encoding="utf-8")
+        event["ts"] = _now_iso()
+        line = jsonio.dumps(event) + b"\n"
+        # One appended line per event instead of rewriting the whole session snapshot
+        with _events_file().open("a+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                # A crash mid-append leaves a torn last line; start a fresh one so this event is kept
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
 
     def update_context(self, context: Context) -> Dict[str, Any]:
         """Persist an updated Context into the active session.
@@ -125,24 +227,51 @@ class SessionManager:
         """
         if not ACTIVE_FILE.exists():
             raise RuntimeError("No active session to update.")
-        session = json.loads(ACTIVE_FILE.read_text(encoding="utf-8"))
+        session = self._read_snapshot()
         session["context"] = serialize_context(context)
-        ACTIVE_FILE.write_text(json.dumps(session, ensure_ascii=False, indent=2), encoding="utf-8")
+        self._write_snapshot(session)
+        session["events"].extend(_read_events())
         return session
 
     def complete(self, outcome: Optional[str] = None, notes: Optional[str] = None) -> Dict[str, Any]:
+        """Archive the active session and clear it. Returns the archived record, events included."""
         if not ACTIVE_FILE.exists():
             raise RuntimeError("No active session to complete.")
-        session = json.loads(ACTIVE_FILE.read_text(encoding="utf-8"))
-        session["completed_at"] = datetime.now(timezone.utc).isoformat()
+        session = self._read_snapshot()
+        # Events inside active.json (older sessions) come first, then the intact sidecar lines
+        legacy = session.pop("events")
+        lines = _read_event_lines()
+        session["completed_at"] = _now_iso()
         session["status"] = "completed"
         session["outcome"] = outcome
         session["notes"] = notes
-        # Append to archive and remove active file
-        with ARCHIVE_FILE.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(session, ensure_ascii=False) + "\n")
+        # Each kept sidecar line parsed as one JSON object, so it is spliced in as written, not re-encoded
+        raw_events = [jsonio.dumps(e) for e in legacy] + [line for line, _ in lines]
+        header = jsonio.dumps(session)
+        with ARCHIVE_FILE.open("ab") as f:
+            f.write(header[:-1] + b',"events":[' + b",".join(raw_events) + b"]}\n")
         ACTIVE_FILE.unlink(missing_ok=True)
+        _events_file().unlink(missing_ok=True)
+        self._snapshot = None
+        session["events"] = legacy + [event for _, event in lines]
         return session
 
+    def iter_archive(self) -> Iterator[Dict[str, Any]]:
+        """Yield completed sessions from the archive, oldest first, without loading the whole file."""
+        if not ARCHIVE_FILE.exists() or ARCHIVE_FILE.stat().st_size == 0:
+            return
+        with ARCHIVE_FILE.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos, end = 0, len(mm)
+            while pos < end:
+                nl = mm.find(b"\n", pos)
+                if nl == -1:
+                    nl = end
+                line = mm[pos:nl]
+                pos = nl + 1
+                if line.strip():
+                    yield jsonio.loads(line)
+
     def cancel(self) -> None:
         ACTIVE_FILE.unlink(missing_ok=True)
+        _events_file().unlink(missing_ok=True)
+        self._snapshot = None
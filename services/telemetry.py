@@ -3,71 +3,113 @@ Telemetry service: logs play recommendations and outcomes to JSONL files.
 """
 from __future__ import annotations
 
-import json
+import atexit
 import hashlib
+import json
+import threading
+from collections import deque
+from dataclasses import fields, is_dataclass
 from datetime import datetime
+from enum import Enum
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Deque, Dict, Optional
 
 from domain.models import Context, Recommendation
+from services import jsonio
 
 
 LOG_DIR = Path(__file__).resolve().parent.parent / "data" / "logs"
 LOG_FILE = LOG_DIR / "plays.jsonl"
+# Queued entries are appended together once this many are pending, or FLUSH_AFTER_S after the first
+FLUSH_AT = 64
+FLUSH_AFTER_S = 2.0
+
+_pending: Deque[bytes] = deque()
+_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+
+# The LOG_DIR last created; compared on each flush so repointing LOG_DIR (as tests do) still creates it
+_dirs_ready: Optional[Path] = None
 
 
 def _ensure_dirs() -> None:
+    global _dirs_ready
+    if _dirs_ready == LOG_DIR:
+        return
     LOG_DIR.mkdir(parents=True, exist_ok=True)
+    _dirs_ready = LOG_DIR
 
 
-def _enum_to_value(obj: Any) -> Any:
-    try:
-        # Enums in our domain inherit from Enum with .value
-        return obj.value  # type: ignore[attr-defined]
-    except Exception:
-        return obj
+def _identity(obj: Any) -> Any:
+    return obj
 
 
-def _dataclass_to_dict(obj: Any) -> Any:
-    if obj is None:
-        return None
-    if hasattr(obj, "__dataclass_fields__"):
-        data = {}
-        for k, v in obj.__dict__.items():
-            data[k] = _serialize(v)
-        return data
-    return obj
+def _serialize_list(obj: list) -> list:
+    return [x if type(x) in _SCALARS else _serialize(x) for x in obj]
+
+
+def _serialize_dict(obj: dict) -> dict:
+    return {k: v if type(v) in _SCALARS else _serialize(v) for k, v in obj.items()}
+
+
+def _dataclass_serializer(cls: type) -> Callable[[Any], Dict[str, Any]]:
+    names = tuple(f.name for f in fields(cls))
+
+    def serialize(obj: Any) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name in names:
+            v = getattr(obj, name)
+            out[name] = v if type(v) in _SCALARS else _serialize(v)
+        return out
+
+    return serialize
+
+
+def _serializer_for(cls: type) -> Callable[[Any], Any]:
+    if issubclass(cls, Enum):
+        fn: Callable[[Any], Any] = attrgetter("value")
+    elif is_dataclass(cls):
+        fn = _dataclass_serializer(cls)
+    elif issubclass(cls, list):
+        fn = _serialize_list
+    elif issubclass(cls, dict):
+        fn = _serialize_dict
+    else:
+        fn = _identity
+    _DISPATCH[cls] = fn
+    return fn
+
+
+# Keyed on the exact type; other classes (domain enums, dataclasses) are resolved once on first sight.
+# Most leaves are scalars, so containers skip the call for those entirely.
+_SCALARS = frozenset((type(None), str, int, float, bool))
+_DISPATCH: Dict[type, Callable[[Any], Any]] = dict.fromkeys(_SCALARS, _identity)
+_DISPATCH.update({list: _serialize_list, dict: _serialize_dict})
 
 
 def _serialize(obj: Any) -> Any:
-    if obj is None:
-        return None
-    # Enums
-    if hasattr(obj, "value") and not isinstance(obj, (str, bytes)):
-        try:
-            return _enum_to_value(obj)
-        except Exception:
-            pass
-    # Dataclasses
-    if hasattr(obj, "__dataclass_fields__"):
-        return _dataclass_to_dict(obj)
-    # Lists
-    if isinstance(obj, list):
-        return [_serialize(x) for x in obj]
-    # Dicts
-    if isinstance(obj, dict):
-        return {k: _serialize(v) for k, v in obj.items()}
-    return obj
+    cls = type(obj)
+    fn = _DISPATCH.get(cls)
+    if fn is None:
+        fn = _serializer_for(cls)
+    return fn(obj)
+
+
+def _play_id(payload: Dict[str, Any]) -> str:
+    # One canonical preimage whichever encoder jsonio picked: stdlib json's sort_keys layout,
+    # which is also what the ids already in plays.jsonl were computed from
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
 
 
 def make_play_id(context: Context, rec: Recommendation) -> str:
     """Deterministic fingerprint for a recommendation + context."""
-    payload = {
+    return _play_id({
         "context": _serialize(context),
         "recommendation": _serialize(rec),
-    }
-    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
-    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+    })
 
 
 def log_event(
@@ -78,19 +120,55 @@ def log_event(
     note: Optional[str] = None,
     outcome: Optional[str] = None,
 ) -> Dict[str, Any]:
-    """Append a log entry to the JSONL file and return the record."""
-    _ensure_dirs()
+    """Queue a log entry for the JSONL file and return the record.
+
+    Entries are written in batches; call flush() to force them to disk.
+    """
     now = datetime.utcnow().isoformat() + "Z"
+    # Serialize once: the same dicts feed the play id and the logged record
+    ctx_data = _serialize(context)
+    rec_data = _serialize(recommendation)
     rec: Dict[str, Any] = {
         "ts": now,
         "event": event,  # view | applied | worked | didnt_work
-        "play_id": make_play_id(context, recommendation),
-        "context": _serialize(context),
-        "recommendation": _serialize(recommendation),
+        "play_id": _play_id({"context": ctx_data, "recommendation": rec_data}),
+        "context": ctx_data,
+        "recommendation": rec_data,
         "playbook_version": playbook_version,
         "note": note,
         "outcome": outcome,
     }
-    with LOG_FILE.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    line = jsonio.dumps(rec) + b"\n"
+    global _flush_timer
+    with _lock:
+        _pending.append(line)
+        if len(_pending) >= FLUSH_AT:
+            _flush_locked()
+        elif _flush_timer is None:
+            _flush_timer = threading.Timer(FLUSH_AFTER_S, flush)
+            _flush_timer.daemon = True
+            _flush_timer.start()
     return rec
+
+
+def flush() -> None:
+    """Write all queued log entries to LOG_FILE in one append."""
+    with _lock:
+        _flush_locked()
+
+
+def _flush_locked() -> None:
+    global _flush_timer
+    if _flush_timer is not None:
+        _flush_timer.cancel()
+        _flush_timer = None
+    if not _pending:
+        return
+    batch = b"".join(_pending)
+    _pending.clear()
+    _ensure_dirs()
+    with LOG_FILE.open("ab") as f:
+        f.write(batch)
+
+
+atexit.register(flush)
@@ -0,0 +1,29 @@
+from services.repository import DATA_DIR, Repository, get_repo
+
+
+def test_upsert_preset_replaces_by_name_and_round_trips(tmp_path):
+    repo = Repository(tmp_path)
+    repo.upsert_preset("Derby", {"venue": "Home", "note": "ünïcode"})
+    repo.upsert_preset("Cup", {"venue": "Away"})
+    repo.upsert_preset("Derby", {"venue": "Away"})
+    presets = repo.load_presets()
+    assert [p["name"] for p in presets] == ["Cup", "Derby"]
+    assert presets[1]["data"] == {"venue": "Away"}
+    assert not (tmp_path / "presets.json.tmp").exists()
+    # Still human-readable on disk
+    assert (tmp_path / "presets.json").read_text(encoding="utf-8").startswith("[\n  {")
+
+
+def test_loads_are_cached_but_see_rewrites(tmp_path):
+    repo = Repository(tmp_path)
+    (tmp_path / "gestures.json").write_text('{"calm": ["Nod"]}', encoding="utf-8")
+    first = repo.load_gestures()
+    first["calm"].append("Mutated")
+    assert repo.load_gestures() == {"calm": ["Nod"]}
+    (tmp_path / "gestures.json").write_text('{"calm": ["Nod", "Point"]}', encoding="utf-8")
+    assert repo.load_gestures() == {"calm": ["Nod", "Point"]}
+
+
+def test_get_repo_returns_shared_instance_over_data_dir():
+    assert get_repo() is get_repo()
+    assert get_repo().data_dir == DATA_DIR
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+from domain.models import *
+from domain.rules_engine import recommend
+import services.telemetry as telemetry
+
+
+def make_ctx(**kwargs):
+    defaults = dict(stage=MatchStage.MID, fav_status=FavStatus.FAVOURITE, venue=Venue.HOME)
+    defaults.update(kwargs)
+    return Context(**defaults)
+
+
+def test_log_event_appends_record_with_stable_play_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "LOG_DIR", tmp_path)
+    monkeypatch.setattr(telemetry, "LOG_FILE", tmp_path / "plays.jsonl")
+    ctx = make_ctx(score_state=ScoreState.DRAWING, minute=30)
+    rec = recommend(ctx)
+    assert rec is not None
+
+    first = telemetry.log_event("view", ctx, rec)
+    second = telemetry.log_event("applied", ctx, rec, note="ok")
+
+    assert first["play_id"] == second["play_id"] == telemetry.make_play_id(ctx, rec)
+    telemetry.flush()
+    lines = (tmp_path / "plays.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["event"] for line in lines] == ["view", "applied"]
+    assert json.loads(lines[0])["context"]["stage"] == "Mid"
+
+
+def test_log_event_batches_until_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "LOG_DIR", tmp_path)
+    monkeypatch.setattr(telemetry, "LOG_FILE", tmp_path / "plays.jsonl")
+    monkeypatch.setattr(telemetry, "FLUSH_AT", 3)
+    ctx = make_ctx(score_state=ScoreState.LOSING, minute=70)
+    rec = recommend(ctx)
+    telemetry.log_event("view", ctx, rec)
+    telemetry.log_event("applied", ctx, rec)
+    assert not (tmp_path / "plays.jsonl").exists()
+    telemetry.log_event("worked", ctx, rec)
+    assert len((tmp_path / "plays.jsonl").read_bytes().splitlines()) == 3
+    telemetry.log_event("view", ctx, rec)
+    telemetry.flush()
+    assert len((tmp_path / "plays.jsonl").read_bytes().splitlines()) == 4
+
+
+def test_play_ids_of_logged_rows_still_reproduce():
+    # Rows captured from data/logs/plays.jsonl; ids already written must keep matching
+    fp = Path(__file__).resolve().parent / "fixtures" / "plays_sample.jsonl"
+    rows = [json.loads(line) for line in fp.read_text(encoding="utf-8").splitlines() if line.strip()]
+    assert len(rows) == 4
+    for row in rows:
+        assert telemetry._play_id({"context": row["context"], "recommendation": row["recommendation"]}) == row["play_id"]
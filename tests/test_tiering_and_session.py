@@ -1,8 +1,22 @@
+import json
+
+import pytest
+
 from domain.models import *
-from domain.rules_engine import detect_matchup_tier, recommend
+from domain.rules_engine import detect_matchup_tier, detect_fav_status, derive_context_features, recommend
 from services.session import SessionManager
 
 
+@pytest.fixture
+def session_paths(tmp_path, monkeypatch):
+    """Point the session service's files at tmp_path for the duration of a test."""
+    import services.session as sess
+    monkeypatch.setattr(sess, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(sess, "ACTIVE_FILE", tmp_path / "active.json")
+    monkeypatch.setattr(sess, "ARCHIVE_FILE", tmp_path / "sessions.jsonl")
+    return tmp_path
+
+
 def make_ctx(**kwargs):
     defaults = dict(stage=MatchStage.PRE_MATCH, fav_status=FavStatus.FAVOURITE, venue=Venue.HOME)
     defaults.update(kwargs)
@@ -20,27 +34,23 @@ def test_detect_matchup_tier_even_band():
     assert isinstance(expl, str) and expl
 
 
-def test_recommend_trace_present_and_serializable(tmp_path, monkeypatch):
+def test_recommend_trace_present_and_serializable(session_paths):
     # Start a session and ensure we can append an event carrying trace/tier/edge fields
     sm = SessionManager()
-    # Point the session files to a temp dir
-    import services.session as sess
-    sess.DATA_DIR = tmp_path
-    sess.ACTIVE_FILE = tmp_path / "active.json"
-    sess.ARCHIVE_FILE = tmp_path / "sessions.jsonl"
-    sm = SessionManager()
 
     ctx = make_ctx(team_position=3, opponent_position=13, team_form="WWWDD", opponent_form="LDLLD")
     sm.start(ctx, name="Test Match")
     rec = recommend(ctx)
     assert rec is not None
+    assert isinstance(rec.shout, Shout)
+    tier, edge, _ = detect_matchup_tier(ctx)
     event = {
         "type": "decision",
         "payload": {
             "fav_status": ctx.fav_status.value,
             "auto_fav_status": ctx.auto_fav_status,
-            "tier": detect_matchup_tier(ctx)[0].value,
-            "edge": detect_matchup_tier(ctx)[1],
+            "tier": tier.value,
+            "edge": edge,
             "trace": rec.trace,
         }
     }
@@ -60,4 +70,201 @@ def test_venue_asymmetry_in_tier_edge():
     ctx_away = make_ctx(venue=Venue.AWAY, **base)
     tier_h, edge_h, _ = detect_matchup_tier(ctx_home)
     tier_a, edge_a, _ = detect_matchup_tier(ctx_away)
-    assert edge_h > edge_a
\ No newline at end of file
+    assert edge_h > edge_a
+
+
+def test_precomputed_features_match_inline_detection():
+    ctx = make_ctx(venue=Venue.AWAY, team_position=4, opponent_position=11, team_form="WWDWL", opponent_form="LLDWD")
+    feats = derive_context_features(ctx)
+    assert detect_fav_status(ctx, feats) == detect_fav_status(ctx)
+    assert detect_matchup_tier(ctx, feats) == detect_matchup_tier(ctx)
+
+
+def test_matchup_tier_memoized_on_inputs_not_identity():
+    import domain.rules_engine as engine
+    ctx = make_ctx(team_position=5, opponent_position=12, team_form="WWDLW", opponent_form="LDLLW", xg_for=1.1, xg_against=0.4)
+    first = detect_matchup_tier(ctx)
+    hits = engine._matchup_tier.cache_info().hits
+    assert detect_matchup_tier(make_ctx(team_position=5, opponent_position=12, team_form="WWDLW", opponent_form="LDLLW", xg_for=1.1, xg_against=0.4)) == first
+    assert engine._matchup_tier.cache_info().hits == hits + 1
+    ctx.xg_against = 2.5
+    assert detect_matchup_tier(ctx)[1] < first[1]
+
+
+def test_matchup_tier_sees_config_rewrite_with_unchanged_mtime(tmp_path, monkeypatch):
+    import os
+    import domain.rules_engine as engine
+    cfg = tmp_path / "engine_config.json"
+    monkeypatch.setattr(engine, "_ENGINE_CONFIG_FP", cfg)
+    cfg.write_text(json.dumps({"advantage_model": {"venue_home": 0.6}}), encoding="utf-8")
+    ctx = make_ctx(team_position=8, opponent_position=8)
+    before = detect_matchup_tier(ctx)[1]
+    mtime_ns = cfg.stat().st_mtime_ns
+    cfg.write_text(json.dumps({"advantage_model": {"venue_home": 2.25}}), encoding="utf-8")
+    # Coarse-timestamp filesystems can leave the mtime unchanged across a quick rewrite
+    os.utime(cfg, ns=(mtime_ns, mtime_ns))
+    assert detect_matchup_tier(ctx)[1] > before
+
+
+def test_matchup_tier_cached_per_config_path(tmp_path, monkeypatch):
+    import os
+    import domain.rules_engine as engine
+    ctx = make_ctx(team_position=8, opponent_position=8)
+    edges = []
+    for name, venue_home in (("a", 0.6), ("b", 2.5)):
+        cfg = tmp_path / name / "engine_config.json"
+        cfg.parent.mkdir()
+        cfg.write_text(json.dumps({"advantage_model": {"venue_home": venue_home}}), encoding="utf-8")
+        # Same mtime and size in both directories, so only the path tells the configs apart
+        os.utime(cfg, ns=(10**18, 10**18))
+        monkeypatch.setattr(engine, "_ENGINE_CONFIG_FP", cfg)
+        edges.append(detect_matchup_tier(ctx)[1])
+    assert edges[1] > edges[0]
+
+
+def test_rule_models_validated_once_per_file_version(tmp_path, monkeypatch):
+    import domain.rules_engine as engine
+    monkeypatch.setattr(engine, "_DATA_DIR", tmp_path)
+    fp = tmp_path / "rules" / "normalized" / "reaction_rules.json"
+    fp.parent.mkdir(parents=True)
+    fp.write_text(json.dumps([{"reaction": "Complacent", "adjustment": {"mentalityDelta": 1}}]), encoding="utf-8")
+    first = engine._load_reaction_rules()
+    assert engine._load_reaction_rules()[0] is first[0]
+    fp.write_text(json.dumps([{"reaction": "Complacent", "adjustment": {"mentalityDelta": -1, "notes": ["x"]}}]), encoding="utf-8")
+    assert engine._load_reaction_rules()[0].adjustment.mentalityDelta == -1
+
+
+def test_rule_models_cached_per_path_not_per_filename(tmp_path, monkeypatch):
+    import os
+    import domain.rules_engine as engine
+    payloads = {"a": {"mentalityDelta": 1}, "b": {"mentalityDelta": 2}}
+    for name, adj in payloads.items():
+        fp = tmp_path / name / "rules" / "normalized" / "reaction_rules.json"
+        fp.parent.mkdir(parents=True)
+        fp.write_text(json.dumps([{"reaction": "Complacent", "adjustment": adj}]), encoding="utf-8")
+        os.utime(fp, ns=(1_700_000_000_000_000_000, 1_700_000_000_000_000_000))
+    for name, adj in payloads.items():
+        monkeypatch.setattr(engine, "_DATA_DIR", tmp_path / name)
+        assert engine._load_reaction_rules()[0].adjustment.mentalityDelta == adj["mentalityDelta"]
+
+
+def test_session_events_append_to_sidecar_and_archive_merged(tmp_path, session_paths):
+    sm = SessionManager()
+    sm.start(make_ctx(), name="Sidecar")
+    snapshot = (tmp_path / "active.json").read_bytes()
+    sm.append_event({"type": "decision", "payload": {"n": 1}})
+    sm.append_event({"type": "decision", "payload": {"n": 2}})
+    # Appends leave the snapshot alone
+    assert (tmp_path / "active.json").read_bytes() == snapshot
+    assert [e["payload"]["n"] for e in sm.get_active()["events"]] == [1, 2]
+    done = sm.complete(notes="fine")
+    assert [e["payload"]["n"] for e in done["events"]] == [1, 2]
+    assert not (tmp_path / "active.json").exists()
+    assert not (tmp_path / "active_events.jsonl").exists()
+    archived = json.loads((tmp_path / "sessions.jsonl").read_text(encoding="utf-8").splitlines()[-1])
+    assert archived == done
+
+
+def test_complete_drops_a_torn_sidecar_line(tmp_path, session_paths):
+    sm = SessionManager()
+    sm.start(make_ctx(), name="Torn")
+    sm.append_event({"type": "decision", "payload": {"n": 1}})
+    # An interrupted append leaves half a line behind
+    with (tmp_path / "active_events.jsonl").open("ab") as f:
+        f.write(b'{"type": "decision", "payl')
+    assert [e["payload"]["n"] for e in sm.get_active()["events"]] == [1]
+    done = sm.complete()
+    assert [e["payload"]["n"] for e in done["events"]] == [1]
+    assert [s["events"] for s in sm.iter_archive()] == [done["events"]]
+
+
+def test_append_after_a_torn_sidecar_line_keeps_the_event(tmp_path, session_paths):
+    sm = SessionManager()
+    sm.start(make_ctx(), name="Torn")
+    sm.append_event({"type": "decision", "payload": {"n": 1}})
+    with (tmp_path / "active_events.jsonl").open("ab") as f:
+        f.write(b'{"type": "decision", "payl')
+    sm.append_event({"type": "decision", "payload": {"n": 3}})
+    assert [e["payload"]["n"] for e in sm.get_active()["events"]] == [1, 3]
+    assert [e["payload"]["n"] for e in sm.complete()["events"]] == [1, 3]
+
+
+def test_iter_archive_yields_each_completed_session(tmp_path, session_paths):
+    sm = SessionManager()
+    assert list(sm.iter_archive()) == []
+    for name in ("First", "Second"):
+        sm.start(make_ctx(), name=name)
+        sm.complete()
+    # A hand-appended record without a trailing newline is still read
+    with (tmp_path / "sessions.jsonl").open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "Manual", "events": []}))
+    assert [s["name"] for s in sm.iter_archive()] == ["First", "Second", "Manual"]
+
+
+def test_update_context_reuses_snapshot_but_sees_external_edits(tmp_path, session_paths):
+    sm = SessionManager()
+    started = sm.start(make_ctx(), name="Snapshot")
+    started["name"] = "mutated by caller"
+    sm.append_event({"type": "note", "payload": {}})
+    updated = sm.update_context(make_ctx(stage=MatchStage.MID))
+    assert updated["name"] == "Snapshot"
+    assert updated["context"]["stage"] == "Mid"
+    assert len(updated["events"]) == 1
+    # Another writer (e.g. a second process) changes the file: the next update must build on it
+    data = json.loads((tmp_path / "active.json").read_text(encoding="utf-8"))
+    data["name"] = "Renamed"
+    (tmp_path / "active.json").write_text(json.dumps(data), encoding="utf-8")
+    assert sm.update_context(make_ctx(stage=MatchStage.LATE))["name"] == "Renamed"
+
+
+def test_callers_cannot_mutate_the_held_snapshot(session_paths):
+    sm = SessionManager()
+    started = sm.start(make_ctx(special_situations=[SpecialSituation.DERBY]), name="Copies")
+    started["context"]["stage"] = "Late"
+    first = sm.get_active()
+    first["context"]["stage"] = "Mid"
+    first["context"]["special_situations"].append("Cup Final")
+    again = sm.get_active()
+    assert again["context"]["stage"] == "PreMatch"
+    assert again["context"]["special_situations"] == ["Derby"]
+    assert sm.complete()["context"] == again["context"]
+
+
+def test_get_active_parses_active_json_only_when_it_changes(tmp_path, monkeypatch, session_paths):
+    sm = SessionManager()
+    assert sm.get_active() is None
+    sm.start(make_ctx(), name="Cached")
+    parsed = []
+    from services import jsonio
+    real_loads = jsonio.loads
+    monkeypatch.setattr(jsonio, "loads", lambda raw: parsed.append(raw) or real_loads(raw))
+    first = sm.get_active()
+    first["events"].append({"type": "caller-only"})
+    assert sm.get_active()["events"] == []
+    assert parsed == []
+    data = json.loads((tmp_path / "active.json").read_text(encoding="utf-8"))
+    data["name"] = "Edited elsewhere"
+    (tmp_path / "active.json").write_text(json.dumps(data), encoding="utf-8")
+    assert sm.get_active()["name"] == "Edited elsewhere"
+    assert len(parsed) == 1
+
+
+def test_now_iso_matches_datetime_isoformat():
+    from datetime import datetime, timezone
+    from services.session import _now_iso
+    before = datetime.now(timezone.utc)
+    stamp = datetime.fromisoformat(_now_iso())
+    assert stamp.tzinfo is not None and stamp.utcoffset().total_seconds() == 0
+    assert before <= stamp <= datetime.now(timezone.utc)
+
+
+def test_context_round_trip_and_unknown_values():
+    from services.session import serialize_context, deserialize_context
+    ctx = make_ctx(
+        stage=MatchStage.LATE, venue=Venue.AWAY, score_state=ScoreState.LOSING, minute=70,
+        special_situations=[SpecialSituation.DERBY], player_reactions=[PlayerReaction.COMPLACENT],
+        preferred_talk_audience=TalkAudience.TEAM,
+    )
+    assert deserialize_context(serialize_context(ctx)) == ctx
+    with pytest.raises(ValueError):
+        deserialize_context({**serialize_context(ctx), "stage": "Extra Innings"})